@@ -162,3 +162,149 @@ EXPORT char** generate_plot_matrix(int width, int height) {
 }
 
 
+
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+/**
+ * @brief Signed area, centroid and second moments of many polygons (shoelace).
+ *
+ * Polygons are stored ragged: the vertices of polygon k are rows
+ * offsets[k] .. offsets[k+1]-1 of the (nverts, 2) array xy, without the
+ * closing vertex. Sums are taken relative to each polygon's first vertex
+ * to limit cancellation. Output arrays are filled in place.
+ *
+ * @param npoly Number of polygons, offsets has npoly + 1 entries.
+ * @param area (npoly) signed area, positive for counterclockwise polygons.
+ * @param centroid (npoly, 2) centroids, NaN for zero area.
+ * @param second (npoly, 3) integrals of y^2, x^2 and xy over the polygon,
+ * about its centroid, independent of orientation. May be NULL.
+ * @param nthreads Number of OpenMP threads, 0 for the default.
+ */
+EXPORT void polygon_moments(long long npoly, const long long* offsets, const double* xy,
+                            double* area, double* centroid, double* second, int nthreads) {
+#ifdef _OPENMP
+    if (nthreads <= 0) {
+        nthreads = omp_get_max_threads();
+    }
+#pragma omp parallel for schedule(static) num_threads(nthreads)
+#endif
+    for (long long k = 0; k < npoly; k++) {
+        long long s = offsets[k], e = offsets[k + 1];
+        double a = 0.0, cx = 0.0, cy = 0.0, ixx = 0.0, iyy = 0.0, ixy = 0.0;
+        double ox = 0.0, oy = 0.0;
+        if (e > s) {
+            ox = xy[2 * s];
+            oy = xy[2 * s + 1];
+        }
+        for (long long i = s; i < e; i++) {
+            long long j = i + 1 < e ? i + 1 : s;
+            double x0 = xy[2 * i] - ox, y0 = xy[2 * i + 1] - oy;
+            double x1 = xy[2 * j] - ox, y1 = xy[2 * j + 1] - oy;
+            double cr = det2x2(x0, x1, y0, y1);
+            a += cr;
+            cx += (x0 + x1) * cr;
+            cy += (y0 + y1) * cr;
+            ixx += (y0 * y0 + y0 * y1 + y1 * y1) * cr;
+            iyy += (x0 * x0 + x0 * x1 + x1 * x1) * cr;
+            ixy += (x0 * y1 + 2.0 * x0 * y0 + 2.0 * x1 * y1 + x1 * y0) * cr;
+        }
+        a *= 0.5;
+        area[k] = a;
+        double gx = a != 0.0 ? cx / (6.0 * a) : NAN;
+        double gy = a != 0.0 ? cy / (6.0 * a) : NAN;
+        centroid[2 * k] = gx + ox;
+        centroid[2 * k + 1] = gy + oy;
+        if (second != NULL) {
+            /* parallel axis theorem from the first vertex to the centroid */
+            double sg = a < 0.0 ? -1.0 : 1.0;
+            second[3 * k] = sg * (ixx / 12.0 - a * gy * gy);
+            second[3 * k + 1] = sg * (iyy / 12.0 - a * gx * gx);
+            second[3 * k + 2] = sg * (ixy / 24.0 - a * gx * gy);
+            if (a == 0.0) {
+                second[3 * k] = second[3 * k + 1] = second[3 * k + 2] = 0.0;
+            }
+        }
+    }
+}
+
+/**
+ * @brief Rasterizes the region where every conic and line inequality holds.
+ *
+ * Pixel (i, j) of the row-major height x width mask is tested at its centre
+ * x = x_min + (j + 0.5) * (x_max - x_min) / width,
+ * y = y_max - (i + 0.5) * (y_max - y_min) / height,
+ * so row 0 is the top as in generate_plot_matrix. Rows are split across
+ * OpenMP threads and the mask is written in place.
+ *
+ * @param mask Caller-owned uint8 buffer of height * width, set to 1 inside, 0 outside.
+ * @param conics (nconic, 6) rows a, b, c, d, e, f meaning
+ * a x^2 + 2b xy + c y^2 + 2d x + 2e y + f <= 0.
+ * @param lines (nline, 3) rows n0, n1, c meaning n0 x + n1 y <= c.
+ * @param nthreads Number of OpenMP threads, 0 for the default.
+ * @return The number of inside pixels, -1 if scratch memory could not be allocated.
+ */
+EXPORT long long rasterize_region(unsigned char* mask, int width, int height,
+                                  double x_min, double x_max, double y_min, double y_max,
+                                  int nconic, const double* conics, int nline, const double* lines,
+                                  int nthreads) {
+    double dx = (x_max - x_min) / width;
+    double dy = (y_max - y_min) / height;
+    long long count = 0;
+    int failed = 0;
+#ifdef _OPENMP
+    if (nthreads <= 0) {
+        nthreads = omp_get_max_threads();
+    }
+#pragma omp parallel num_threads(nthreads) reduction(+:count)
+#endif
+    {
+        /* per row, each conic is a quadratic q2 x^2 + q1 x + q0 and each line q1 x + q0 */
+        double* q = malloc(3 * (size_t)(nconic + nline) * sizeof(double) + 1);
+        if (q == NULL) {
+#ifdef _OPENMP
+#pragma omp atomic write
+#endif
+            failed = 1;
+        }
+#ifdef _OPENMP
+#pragma omp for schedule(static)
+#endif
+        for (int i = 0; i < height; i++) {
+            /* every thread still takes part in the loop, rows of a failed thread are skipped */
+            if (q == NULL) {
+                continue;
+            }
+            double y = y_max - (i + 0.5) * dy;
+            unsigned char* row = mask + (size_t)i * width;
+            for (int k = 0; k < nconic; k++) {
+                const double* p = conics + 6 * k;
+                q[3 * k] = p[0];
+                q[3 * k + 1] = 2.0 * (p[1] * y + p[3]);
+                q[3 * k + 2] = (p[2] * y + 2.0 * p[4]) * y + p[5];
+            }
+            for (int k = 0; k < nline; k++) {
+                const double* p = lines + 3 * k;
+                q[3 * (nconic + k) + 1] = p[0];
+                q[3 * (nconic + k) + 2] = p[1] * y - p[2];
+            }
+            long long c = 0;
+            for (int j = 0; j < width; j++) {
+                double x = x_min + (j + 0.5) * dx;
+                int in = 1;
+                for (int k = 0; k < nconic && in; k++) {
+                    in = (q[3 * k] * x + q[3 * k + 1]) * x + q[3 * k + 2] <= 0.0;
+                }
+                for (int k = nconic; k < nconic + nline && in; k++) {
+                    in = q[3 * k + 1] * x + q[3 * k + 2] <= 0.0;
+                }
+                row[j] = (unsigned char)in;
+                c += in;
+            }
+            count += c;
+        }
+        free(q);
+    }
+    return failed ? -1 : count;
+}
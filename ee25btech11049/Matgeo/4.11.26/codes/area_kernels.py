@@ -0,0 +1,101 @@
+# NumPy interface to the polygon and raster kernels in area.c
+# Results are written straight into (optionally preallocated) NumPy arrays.
+
+import ctypes
+import os
+import subprocess
+
+import numpy as np
+from numpy.ctypeslib import ndpointer
+
+# --- Load the C library, building it when missing or out of date ---
+
+_dir = os.path.dirname(os.path.abspath(__file__))
+_src = os.path.join(_dir, "area.c")
+_lib = os.path.join(_dir, "area.so")
+
+if not os.path.exists(_lib) or os.path.getmtime(_lib) < os.path.getmtime(_src):
+    subprocess.run(["gcc", "-O2", "-fopenmp", "-shared", "-fPIC", _src, "-o", _lib, "-lm"], check=True)
+area_lib = ctypes.CDLL(_lib)
+
+_f8 = ndpointer(dtype=np.float64, flags="C_CONTIGUOUS")
+_i8 = ndpointer(dtype=np.int64, flags="C_CONTIGUOUS")
+# second moments are optional
+_f8_or_null = ctypes.c_void_p
+
+area_lib.polygon_moments.argtypes = [ctypes.c_longlong, _i8, _f8, _f8, _f8, _f8_or_null, ctypes.c_int]
+area_lib.polygon_moments.restype = None
+area_lib.rasterize_region.argtypes = [ndpointer(dtype=np.uint8, flags="C_CONTIGUOUS"), ctypes.c_int, ctypes.c_int,
+                                      ctypes.c_double, ctypes.c_double, ctypes.c_double, ctypes.c_double,
+                                      ctypes.c_int, _f8, ctypes.c_int, _f8, ctypes.c_int]
+area_lib.rasterize_region.restype = ctypes.c_longlong
+
+
+def ragged(polys):
+    """offsets (P+1,) int64 and flat (V,2) vertices from a list of (n_k,2) polygons"""
+    sizes = np.array([len(p) for p in polys], dtype=np.int64)
+    offsets = np.zeros(len(polys) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    xy = np.concatenate([np.asarray(p, dtype=float).reshape(-1, 2) for p in polys]) if polys else np.zeros((0, 2))
+    return offsets, np.ascontiguousarray(xy)
+
+
+def polygon_moments(offsets, xy, area=None, centroid=None, second=None, moments=True, nthreads=0):
+    """Signed area (P,), centroid (P,2) and second moments (P,3) of ragged polygons
+
+    Polygon k has vertices xy[offsets[k]:offsets[k+1]], not closed.
+    Second moments are the integrals of y^2, x^2 and xy about the centroid.
+    Output arrays may be passed in to avoid allocation; moments=False
+    skips the second moments and returns None for them.
+    """
+    offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+    xy = np.ascontiguousarray(xy, dtype=np.float64).reshape(-1, 2)
+    if offsets.ndim != 1 or offsets.size < 1:
+        raise ValueError("offsets must be a 1-D array with at least one entry")
+    if offsets[0] < 0 or np.any(np.diff(offsets) < 0):
+        raise ValueError("offsets must be non-negative and non-decreasing")
+    if offsets[-1] > xy.shape[0]:
+        raise ValueError("offsets run past the vertex array")
+    npoly = offsets.size - 1
+    if area is None:
+        area = np.empty(npoly)
+    if centroid is None:
+        centroid = np.empty((npoly, 2))
+    if moments and second is None:
+        second = np.empty((npoly, 3))
+    for buf, shape in ((area, (npoly,)), (centroid, (npoly, 2))) + (((second, (npoly, 3)),) if moments else ()):
+        if buf.shape != shape or buf.dtype != np.float64 or not buf.flags.c_contiguous:
+            raise ValueError(f"output buffers must be C contiguous float64 of shape {shape}")
+    area_lib.polygon_moments(npoly, offsets, xy, area, centroid,
+                             second.ctypes.data if moments else None, nthreads)
+    return area, centroid, second if moments else None
+
+
+def rasterize(conics=(), lines=(), width=512, height=512, extent=(-1, 3, -0.5, 1.5), out=None, nthreads=0):
+    """Mask of the region where every conic and line inequality holds
+
+    conics: sequence of (V, u, f) meaning x^T V x + 2u^T x + f <= 0
+    lines: sequence of (n, c) meaning n^T x <= c
+    extent: (x_min, x_max, y_min, y_max), pixels are tested at their centres
+    and row 0 is the top. out may be a preallocated (height, width) uint8
+    array. Returns the mask and the pixel-count area estimate.
+    """
+    x_min, x_max, y_min, y_max = extent
+    con = np.zeros((len(conics), 6))
+    for k, (V, u, f) in enumerate(conics):
+        V = np.asarray(V, dtype=float).reshape(2, 2)
+        u = np.asarray(u, dtype=float).ravel()
+        con[k] = V[0, 0], V[0, 1], V[1, 1], u[0], u[1], float(np.ravel(f)[0])
+    lin = np.zeros((len(lines), 3))
+    for k, (n, c) in enumerate(lines):
+        n = np.asarray(n, dtype=float).ravel()
+        lin[k] = n[0], n[1], float(np.ravel(c)[0])
+    if out is None:
+        out = np.empty((height, width), dtype=np.uint8)
+    if out.shape != (height, width) or out.dtype != np.uint8 or not out.flags.c_contiguous:
+        raise ValueError("out must be a C contiguous uint8 array of shape (height, width)")
+    count = area_lib.rasterize_region(out, width, height, x_min, x_max, y_min, y_max,
+                                      len(con), con, len(lin), lin, nthreads)
+    if count < 0:
+        raise MemoryError("rasterize_region could not allocate its row buffers")
+    return out, count*(x_max - x_min)*(y_max - y_min)/(width*height)
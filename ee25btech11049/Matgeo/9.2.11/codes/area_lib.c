@@ -30,3 +30,344 @@ double trapezoidal_area(double a, double b, int n) {
     return h * sum;
 }
 
+
+/*
+ * Quadrature engine
+ *
+ * The integrand is a weighted sum of curve primitives, each described by
+ * QUAD_NPAR doubles so the whole evaluation loop stays in C:
+ *   QUAD_LINE  : w, m, c                 -> w * (m x + c)
+ *   QUAD_SQRT  : w, p, q                 -> w * sqrt(p x + q)
+ *   QUAD_CONIC : w, a, b, c, d, e, f, s  -> w * y, the branch s = +1 or -1 of
+ *                a x^2 + 2b xy + c y^2 + 2d x + 2e y + f = 0 solved for y
+ * Negative radicands (round-off at tangencies) are clamped to zero.
+ */
+
+#include <float.h>
+
+#define QUAD_LINE 0
+#define QUAD_SQRT 1
+#define QUAD_CONIC 2
+#define QUAD_NPAR 8
+
+typedef struct {
+    int nterm;
+    const int *kind;
+    const double *par;
+    long neval;
+} quad_func_t;
+
+/**
+ * @brief Evaluates the sum of primitives at x.
+ */
+static double quad_eval(quad_func_t *q, double x) {
+    double sum = 0.0;
+    q->neval++;
+    for (int k = 0; k < q->nterm; k++) {
+        const double *p = q->par + QUAD_NPAR * k;
+        double y = 0.0, r;
+        switch (q->kind[k]) {
+        case QUAD_LINE:
+            y = p[1] * x + p[2];
+            break;
+        case QUAD_SQRT:
+            r = p[1] * x + p[2];
+            y = r > 0.0 ? sqrt(r) : 0.0;
+            break;
+        case QUAD_CONIC: {
+            double B = p[2] * x + p[5];
+            double C = (p[1] * x + 2.0 * p[4]) * x + p[6];
+            if (p[3] == 0.0) {
+                y = -0.5 * C / B;
+            } else {
+                r = B * B - p[3] * C;
+                r = r > 0.0 ? sqrt(r) : 0.0;
+                /* stable root selection, the other root from the product */
+                double t = -(B + copysign(r, B));
+                double y1 = t / p[3];
+                double y2 = t != 0.0 ? C / t : y1;
+                double hi = y1 > y2 ? y1 : y2, lo = y1 > y2 ? y2 : y1;
+                y = p[7] > 0.0 ? hi : lo;
+            }
+            break;
+        }
+        }
+        sum += p[0] * y;
+    }
+    return sum;
+}
+
+/**
+ * @brief Evaluates the integrand at n points, for plotting and checks.
+ */
+void quad_func(int n, const double *x, double *y, int nterm, const int *kind, const double *par) {
+    quad_func_t q = {nterm, kind, par, 0};
+    for (int i = 0; i < n; i++) {
+        y[i] = quad_eval(&q, x[i]);
+    }
+}
+
+/* Adaptive Simpson on [a,b] given f at a, m, b and the whole-interval rule */
+static double simpson_rec(quad_func_t *q, double a, double fa, double m, double fm,
+                          double b, double fb, double whole, double tol, int depth,
+                          double *err) {
+    double lm = 0.5 * (a + m), rm = 0.5 * (m + b);
+    double flm = quad_eval(q, lm), frm = quad_eval(q, rm);
+    double left = (m - a) / 6.0 * (fa + 4.0 * flm + fm);
+    double right = (b - m) / 6.0 * (fm + 4.0 * frm + fb);
+    double delta = left + right - whole;
+    if (depth <= 0 || fabs(delta) <= 15.0 * tol || lm <= a || rm >= b) {
+        *err += fabs(delta) / 15.0;
+        /* Richardson extrapolation */
+        return left + right + delta / 15.0;
+    }
+    return simpson_rec(q, a, fa, lm, flm, m, fm, left, 0.5 * tol, depth - 1, err) +
+           simpson_rec(q, m, fm, rm, frm, b, fb, right, 0.5 * tol, depth - 1, err);
+}
+
+/**
+ * @brief Adaptive Simpson quadrature of the primitive sum.
+ * @param tol Absolute error target.
+ * @param maxdepth Maximum bisection depth.
+ * @param err Returns the error estimate.
+ * @param neval Returns the number of integrand evaluations.
+ */
+double quad_simpson(double a, double b, int nterm, const int *kind, const double *par,
+                    double tol, int maxdepth, double *err, long *neval) {
+    /* the stop test assumes a < b, a reversed interval is the negated integral */
+    if (b < a) {
+        return -quad_simpson(b, a, nterm, kind, par, tol, maxdepth, err, neval);
+    }
+    quad_func_t q = {nterm, kind, par, 0};
+    double m = 0.5 * (a + b);
+    double fa = quad_eval(&q, a), fm = quad_eval(&q, m), fb = quad_eval(&q, b);
+    double whole = (b - a) / 6.0 * (fa + 4.0 * fm + fb);
+    double e = 0.0;
+    double res = simpson_rec(&q, a, fa, m, fm, b, fb, whole, tol, maxdepth, &e);
+    *err = e;
+    *neval = q.neval;
+    return res;
+}
+
+/* Gauss-Legendre nodes and weights on [-1,1], computed once per order */
+#define GL_MAX 64
+static double gl_x[GL_MAX + 1][GL_MAX];
+static double gl_w[GL_MAX + 1][GL_MAX];
+static int gl_ready[GL_MAX + 1];
+
+static void gl_nodes(int n) {
+    if (gl_ready[n]) {
+        return;
+    }
+    for (int i = 0; i < (n + 1) / 2; i++) {
+        double x = cos(M_PI * (i + 0.75) / (n + 0.5)), dp = 1.0;
+        for (int it = 0; it < 100; it++) {
+            /* Legendre recurrence for P_n and its derivative */
+            double p0 = 1.0, p1 = x;
+            for (int k = 2; k <= n; k++) {
+                double p2 = ((2 * k - 1) * x * p1 - (k - 1) * p0) / k;
+                p0 = p1;
+                p1 = p2;
+            }
+            dp = n * (x * p1 - p0) / (x * x - 1.0);
+            double dx = p1 / dp;
+            x -= dx;
+            if (fabs(dx) <= 1e-16) {
+                break;
+            }
+        }
+        gl_x[n][i] = -x;
+        gl_x[n][n - 1 - i] = x;
+        gl_w[n][i] = gl_w[n][n - 1 - i] = 2.0 / ((1.0 - x * x) * dp * dp);
+    }
+    gl_ready[n] = 1;
+}
+
+static double gl_rule(quad_func_t *q, int n, double a, double b) {
+    double c = 0.5 * (a + b), h = 0.5 * (b - a), s = 0.0;
+    for (int i = 0; i < n; i++) {
+        s += gl_w[n][i] * quad_eval(q, c + h * gl_x[n][i]);
+    }
+    return h * s;
+}
+
+static double gauss_rec(quad_func_t *q, int n, double a, double b, double whole,
+                        double tol, int depth, double *err) {
+    double m = 0.5 * (a + b);
+    double left = gl_rule(q, n, a, m), right = gl_rule(q, n, m, b);
+    double delta = left + right - whole;
+    if (depth <= 0 || fabs(delta) <= tol || m <= a || m >= b) {
+        *err += fabs(delta);
+        return left + right;
+    }
+    return gauss_rec(q, n, a, m, left, 0.5 * tol, depth - 1, err) +
+           gauss_rec(q, n, m, b, right, 0.5 * tol, depth - 1, err);
+}
+
+/**
+ * @brief Adaptive Gauss-Legendre quadrature of the primitive sum.
+ * @param order Points per panel, 1 to 64, nodes are cached per order.
+ * @param tol Absolute error target, a panel is split until its rule
+ * agrees with the sum over its halves.
+ */
+double quad_gauss(double a, double b, int nterm, const int *kind, const double *par,
+                  int order, double tol, int maxdepth, double *err, long *neval) {
+    quad_func_t q = {nterm, kind, par, 0};
+    if (order < 1) {
+        order = 1;
+    }
+    if (order > GL_MAX) {
+        order = GL_MAX;
+    }
+    gl_nodes(order);
+    double e = 0.0;
+    double res = gauss_rec(&q, order, a, b, gl_rule(&q, order, a, b), tol, maxdepth, &e);
+    *err = e;
+    *neval = q.neval;
+    return res;
+}
+
+/**
+ * @brief Tanh-sinh (double exponential) quadrature of the primitive sum.
+ * Nodes cluster doubly exponentially at the ends, so endpoint
+ * singularities such as sqrt(x - a) converge at the full rate.
+ * @param tol Absolute error target between successive halvings of the step.
+ * @param maxlevel Maximum number of step halvings.
+ */
+double quad_tanhsinh(double a, double b, int nterm, const int *kind, const double *par,
+                     double tol, int maxlevel, double *err, long *neval) {
+    /* nodes are placed inward from a and b, so integrate over a < b and negate */
+    if (b < a) {
+        return -quad_tanhsinh(b, a, nterm, kind, par, tol, maxlevel, err, neval);
+    }
+    quad_func_t q = {nterm, kind, par, 0};
+    const double tmax = 4.0;
+    double d = 0.5 * (b - a);
+    double h = 1.0;
+    /* sum of w f over the nodes of the current level, trapezoid in t */
+    double sum = M_PI_2 * quad_eval(&q, a + d);
+    double res = 0.0, prev, delta = INFINITY;
+    for (int level = 0; level <= maxlevel; level++) {
+        /* new nodes are odd multiples of h, all nodes at level 0 */
+        double step = level == 0 ? h : 2.0 * h;
+        for (double t = h; t <= tmax; t += step) {
+            double u = M_PI_2 * sinh(t);
+            double e2 = exp(-2.0 * u);
+            /* distance of the node from either end, without cancellation */
+            double s = 2.0 * d * e2 / (1.0 + e2);
+            double w = M_PI_2 * cosh(t) * 4.0 * e2 / ((1.0 + e2) * (1.0 + e2));
+            if (w < DBL_MIN || s == 0.0) {
+                break;
+            }
+            double xl = a + s, xr = b - s;
+            if (xl <= a || xr >= b) {
+                break;
+            }
+            sum += w * (quad_eval(&q, xl) + quad_eval(&q, xr));
+        }
+        prev = res;
+        res = d * h * sum;
+        if (level > 0) {
+            delta = fabs(res - prev);
+            if (delta <= tol && level >= 3) {
+                break;
+            }
+        }
+        h *= 0.5;
+    }
+    *err = delta;
+    *neval = q.neval;
+    return res;
+}
+
+/*
+ * Parallel compensated Newton-Cotes sums for very large n
+ *
+ * [a,b] is split into nthreads contiguous blocks fixed by nthreads alone.
+ * Each block keeps a Neumaier accumulator and the block sums are added in
+ * block order, so for a given thread count the result is bit-reproducible
+ * whether or not OpenMP is available.
+ */
+
+#include <stdlib.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+typedef struct {
+    double s, c;
+} neumaier_t;
+
+static inline void neumaier_add(neumaier_t *acc, double x) {
+    double t = acc->s + x;
+    if (fabs(acc->s) >= fabs(x)) {
+        acc->c += (acc->s - t) + x;
+    } else {
+        acc->c += (x - t) + acc->s;
+    }
+    acc->s = t;
+}
+
+/**
+ * @brief Composite trapezoid (rule 0) or Simpson (rule 1, n rounded up to
+ * even) sum of the primitive sum over n steps.
+ * @param nthreads Number of blocks and threads, 0 for the OpenMP default.
+ */
+double quad_newton_cotes(double a, double b, long long n, int rule, int nterm,
+                         const int *kind, const double *par, int nthreads) {
+    if (n < 1) {
+        n = 1;
+    }
+    if (rule == 1 && n % 2) {
+        n++;
+    }
+    if (nthreads <= 0) {
+#ifdef _OPENMP
+        nthreads = omp_get_max_threads();
+#else
+        nthreads = 1;
+#endif
+    }
+    double h = (b - a) / (double)n;
+    neumaier_t *part = calloc(nthreads, sizeof(neumaier_t));
+    if (part == NULL) {
+        return NAN;
+    }
+    long long inner = n - 1;
+
+#ifdef _OPENMP
+#pragma omp parallel for schedule(static, 1) num_threads(nthreads)
+#endif
+    for (int t = 0; t < nthreads; t++) {
+        quad_func_t q = {nterm, kind, par, 0};
+        long long lo = 1 + inner * t / nthreads;
+        long long hi = 1 + inner * (t + 1) / nthreads;
+        neumaier_t acc = {0.0, 0.0};
+        for (long long i = lo; i < hi; i++) {
+            double w = rule == 1 ? (i % 2 ? 4.0 : 2.0) : 1.0;
+            neumaier_add(&acc, w * quad_eval(&q, a + (double)i * h));
+        }
+        part[t] = acc;
+    }
+
+    /* ordered reduction of the block sums */
+    quad_func_t q = {nterm, kind, par, 0};
+    neumaier_t sum = {0.0, 0.0};
+    double ends = quad_eval(&q, a) + quad_eval(&q, b);
+    neumaier_add(&sum, rule == 1 ? ends : 0.5 * ends);
+    for (int t = 0; t < nthreads; t++) {
+        neumaier_add(&sum, part[t].s);
+        neumaier_add(&sum, part[t].c);
+    }
+    free(part);
+    return (rule == 1 ? h / 3.0 : h) * (sum.s + sum.c);
+}
+
+/**
+ * @brief Parallel compensated version of trapezoidal_area for 3*sqrt(x).
+ */
+double trapezoidal_area_par(double a, double b, long long n, int nthreads) {
+    const int kind[1] = {QUAD_SQRT};
+    const double par[QUAD_NPAR] = {3.0, 1.0, 0.0};
+    return quad_newton_cotes(a, b, n, 0, 1, kind, par, nthreads);
+}
@@ -0,0 +1,23 @@
+# Scaling benchmark of the Bowyer-Watson Delaunay triangulation
+# Uniform random points in the unit square; triangle counts are
+# checked against 2n - h - 2 from the hull size h.
+
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, '.')
+from libs.triangle.delaunay import delaunay
+
+rng = np.random.default_rng(0)
+
+print(f"{'n':>8} {'triangles':>10} {'time (s)':>10} {'us/point':>10}")
+for n in [1000, 10000, 100000, 1000000]:
+    P = rng.random((n, 2))
+    t0 = time.perf_counter()
+    tri, nbr = delaunay(P)
+    t = time.perf_counter() - t0
+    # Every hull edge has exactly one missing neighbour
+    h = np.count_nonzero(nbr < 0)
+    assert tri.shape[0] == 2*n - h - 2
+    print(f"{n:8d} {tri.shape[0]:10d} {t:10.3f} {1e6*t/n:10.2f}")
@@ -0,0 +1,212 @@
+#released under GNU GPL
+#Areas of regions bounded by conics and lines
+
+import numpy as np
+from .funcs import chord_batch, conic_isect
+
+#Gauss-Legendre nodes on [0,1] for the quadrature fallback
+_gl_t,_gl_w = np.polynomial.legendre.leggauss(32)
+_gl_t = 0.5*(_gl_t+1)
+_gl_w = 0.5*_gl_w
+
+#x coordinates where the boundary can change its structure: pairwise
+#intersections, vertical tangents of the conics and vertical lines
+#returns (R,Q) sorted per region, nan padded
+def _crit_x(V,u,f,n,c):
+    R,K,L = V.shape[0],V.shape[1],n.shape[1]
+    xs = [np.full((R,1),np.nan)]
+    for i in range(K):
+        for j in range(i+1,K):
+            x,mult = conic_isect(V[:,i],u[:,i],f[:,i],V[:,j],u[:,j],f[:,j])
+            xs.append(np.where(mult > 0,x[...,0],np.nan))
+    if K:
+        #the lines and the vertical tangent polars (d g/d y = 0) of the conics
+        #as point + direction, cut with every conic
+        nn = np.concatenate((n,V[:,:,1]),axis=1)
+        cc = np.concatenate((c,-u[:,:,1]),axis=1)
+        if L:
+            k,l = np.meshgrid(np.arange(K),np.arange(L),indexing='ij')
+            k = np.concatenate((k.ravel(),np.arange(K)))
+            l = np.concatenate((l.ravel(),L+np.arange(K)))
+        else:
+            k = l = np.arange(K)
+        nl = nn[:,l].reshape(-1,2)
+        cl = cc[:,l].reshape(-1)
+        m = np.stack((nl[:,1],-nl[:,0]),axis=-1)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            h = (cl/np.einsum('ij,ij->i',nl,nl))[:,None]*nl
+            x,_,cls = chord_batch(V[:,k].reshape(-1,2,2),u[:,k].reshape(-1,2),f[:,k].reshape(-1),m,h)
+        x = np.where((cls > 0)[:,None],x[...,0],np.nan)
+        xs.append(x.reshape(R,-1))
+    if L > 1:
+        i,j = np.triu_indices(L,1)
+        det = n[:,i,0]*n[:,j,1]-n[:,i,1]*n[:,j,0]
+        with np.errstate(divide='ignore',invalid='ignore'):
+            xs.append(np.where(det != 0,(c[:,i]*n[:,j,1]-c[:,j]*n[:,i,1])/det,np.nan))
+    if L:
+        with np.errstate(divide='ignore',invalid='ignore'):
+            xs.append(np.where(n[...,1] == 0,c/n[...,0],np.nan))
+    x = np.concatenate(xs,axis=1)
+    x[~np.isfinite(x)] = np.nan
+    return np.sort(x,axis=1)
+
+#y values of every curve branch at x (R,S), (R,S,2K+L) nan where absent
+#conic k has columns 2k (lower root formula) and 2k+1, line l column 2K+l
+def _branch_y(V,u,f,n,c,x):
+    a,b,cy = V[:,None,:,0,0],V[:,None,:,0,1],V[:,None,:,1,1]
+    d,e = u[:,None,:,0],u[:,None,:,1]
+    xx = x[...,None]
+    B = b*xx+e
+    C = (a*xx+2*d)*xx+f[:,None,:]
+    D = B*B-cy*C
+    with np.errstate(divide='ignore',invalid='ignore'):
+        r = np.sqrt(np.where(D >= 0,D,np.nan))
+        lo = np.where(cy == 0,-0.5*C/B,(-B-r)/cy)
+        hi = np.where(cy == 0,np.nan,(-B+r)/cy)
+        Yl = (c[:,None,:]-xx*n[:,None,:,0])/np.where(n[:,None,:,1] == 0,np.nan,n[:,None,:,1])
+    Y = np.stack((lo,hi),axis=-1).reshape(x.shape+(-1,))
+    Y = np.concatenate((Y,Yl),axis=-1)
+    Y[~np.isfinite(Y)] = np.nan
+    return Y
+
+#Whether the points (x,y), shaped (R,...), satisfy every g <= 0 and n^T x <= c
+def _inside(V,u,f,n,c,x,y):
+    X = np.stack((x,y),axis=-1).reshape(x.shape[0],-1,2)
+    g = np.einsum('rti,rkij,rtj->rtk',X,V,X)+2*np.einsum('rti,rki->rtk',X,u)+f[:,None,:]
+    s = np.einsum('rti,rli->rtl',X,n)-c[:,None,:]
+    ins = np.all(g <= 0,axis=-1) & np.all(s <= 0,axis=-1) & np.isfinite(X).all(axis=-1)
+    return ins.reshape(x.shape)
+
+#Integral of sqrt(al x^2 + be x + ga) between x0 and x1, elementwise
+def _int_sqrt_quad(al,be,ga,x0,x1):
+    def F(x):
+        Q = np.maximum((al*x+be)*x+ga,0)
+        t = 2*al*x+be
+        dl = 4*al*ga-be*be
+        sa = np.sqrt(np.abs(al))
+        sq = np.sqrt(Q)
+        #int dx/sqrt(Q), the log form written to avoid cancellation
+        lp = np.where(t >= 0,np.log(2*sa*sq+t),np.log(np.abs(dl))-np.log(2*sa*sq-t))
+        #arcsin(t/sqrt(-dl)) from the same sqrt(Q) as the first term, so their
+        #errors cancel at vertical tangents
+        am = -np.arctan2(t,2*sa*sq)
+        J = np.where(al > 0,lp,am)/sa
+        return t*sq/(4*al)+np.where(dl == 0,0,dl/(8*al)*J)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        return F(x1)-F(x0)
+
+#Integral over [x0,x1] of the branch sg = -1,1 of a y^2 + ... conic,
+#coefficients a,b,cy = V entries and d,e = u, f, all elementwise
+#closed form for the sqrt of a quadratic, quadrature where that is ill
+#conditioned (nearly linear radicand) or the branch is rational (V[1,1] = 0)
+def _int_conic(a,b,cy,d,e,f,sg,x0,x1):
+    al = b*b-a*cy
+    be = 2*(b*e-cy*d)
+    ga = e*e-cy*f
+    w = x1-x0
+    scale = np.abs(be)*(np.abs(x0)+np.abs(x1)+w)+np.abs(ga)+np.abs(al)*(x0*x0+x1*x1)
+    quad = (cy == 0) | (np.abs(al)*(x0*x0+x1*x1+w*w) <= 1e-4*scale)
+    res = np.empty_like(x0)
+    i = ~quad
+    if np.any(i):
+        poly = -(0.5*b[i]*(x1[i]**2-x0[i]**2)+e[i]*w[i])
+        res[i] = (poly+sg[i]*_int_sqrt_quad(al[i],be[i],ga[i],x0[i],x1[i]))/cy[i]
+    i = quad
+    if np.any(i):
+        #x = x0 + w (1 - cos(pi t))/2 removes square root end singularities
+        tt = np.pi*_gl_t
+        xq = x0[i,None]+0.5*w[i,None]*(1-np.cos(tt))
+        jac = 0.5*np.pi*w[i,None]*np.sin(tt)
+        B = b[i,None]*xq+e[i,None]
+        C = (a[i,None]*xq+2*d[i,None])*xq+f[i,None]
+        D = np.maximum(B*B-cy[i,None]*C,0)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            y = np.where(cy[i,None] == 0,-0.5*C/B,(-B+sg[i,None]*np.sqrt(D))/cy[i,None])
+        res[i] = (y*jac)@_gl_w
+    return res
+
+#Areas of R regions, each where every conic g(x) = x^T V x + 2u^T x + f <= 0
+#and every line n^T x <= c holds
+#V: (R,K,2,2), u: (R,K,2), f: (R,K), n: (R,L,2), c: (R,L), K or L may be 0
+#returns (R,) areas, inf for unbounded regions
+def region_area_batch(V,u,f,n,c,tol=1e-12):
+    V = np.asarray(V,dtype=float)
+    R = V.shape[0]
+    V = V.reshape(R,-1,2,2)
+    K = V.shape[1]
+    u = np.asarray(u,dtype=float).reshape(R,K,2)
+    f = np.asarray(f,dtype=float).reshape(R,K)
+    n = np.asarray(n,dtype=float).reshape(R,-1,2)
+    L = n.shape[1]
+    c = np.asarray(c,dtype=float).reshape(R,L)
+    area = np.zeros(R)
+
+    #merge nearly equal critical x, keep at least one per region
+    xs = _crit_x(V,u,f,n,c)
+    xs[:,0] = np.where(np.isnan(xs[:,0]),0,xs[:,0])
+    span = np.maximum(np.nanmax(np.abs(xs),axis=1),1.0)
+    span = np.maximum(span,np.nanmax(xs,axis=1)-xs[:,0])
+    dup = np.diff(xs,axis=1) <= tol*span[:,None]
+    xs[:,1:][dup] = np.nan
+    xs = np.sort(xs,axis=1)
+    Q = xs.shape[1]
+    last = np.take_along_axis(xs,(np.sum(np.isfinite(xs),axis=1)-1)[:,None],axis=1)[:,0]
+
+    #slab midpoints, probes left and right of all critical x in the
+    #first and last column
+    xm = np.empty((R,Q+1))
+    xm[:,0] = xs[:,0]-span
+    xm[:,1:Q] = 0.5*(xs[:,1:]+xs[:,:-1])
+    xm[:,Q] = last+span
+    Y = _branch_y(V,u,f,n,c,xm)
+    P = Y.shape[-1]
+    order = np.argsort(Y,axis=-1)
+    Ys = np.take_along_axis(Y,order,axis=-1)
+    cnt = np.sum(np.isfinite(Y),axis=-1)
+
+    #probes beyond the extreme branches catch regions unbounded in y
+    ext = np.nanmax(np.abs(np.where(cnt[...,None] > 0,Ys,0)),axis=-1)+span[:,None]
+    lo = np.where(cnt > 0,Ys[...,0],0)-ext
+    top = np.take_along_axis(Ys,np.maximum(cnt-1,0)[...,None],axis=-1)[...,0]
+    hi = np.where(cnt > 0,top,0)+ext
+    live = np.isfinite(xm)
+    unb = np.any(live & (_inside(V,u,f,n,c,xm,lo) | _inside(V,u,f,n,c,xm,hi)),axis=1)
+    if P < 2:
+        area[unb] = np.inf
+        return area
+
+    #cells between consecutive branches
+    ym = 0.5*(Ys[...,1:]+Ys[...,:-1])
+    cell = np.arange(P-1) < (cnt-1)[...,None]
+    ins = cell & _inside(V,u,f,n,c,np.broadcast_to(xm[...,None],ym.shape),ym)
+    unb |= np.any(ins[:,0] | ins[:,Q],axis=-1)
+    ins[:,[0,Q]] = False
+    r,s,j = np.nonzero(ins)
+    x0 = xs[r,s-1]
+    x1 = xs[r,s]
+
+    #upper minus lower branch over each inside cell
+    for col,sg in ((order[r,s,j+1],1.0),(order[r,s,j],-1.0)):
+        con = col < 2*K
+        k,b = np.divmod(col[con],2)
+        rk = r[con]
+        val = _int_conic(V[rk,k,0,0],V[rk,k,0,1],V[rk,k,1,1],u[rk,k,0],u[rk,k,1],f[rk,k],
+                         np.where(b == 0,-1.0,1.0),x0[con],x1[con])
+        area += sg*np.bincount(rk,val,minlength=R)
+        rl = r[~con]
+        l = col[~con]-2*K
+        xa,xb = x0[~con],x1[~con]
+        val = (c[rl,l]*(xb-xa)-0.5*n[rl,l,0]*(xb*xb-xa*xa))/n[rl,l,1]
+        area += sg*np.bincount(rl,val,minlength=R)
+    area[unb] = np.inf
+    return area
+
+#Area of the region where every conic (V,u,f) has x^T V x + 2u^T x + f <= 0
+#and every line (n,c) has n^T x <= c, inf if unbounded
+def region_area(conics=(),lines=(),tol=1e-12):
+    V = np.array([np.asarray(k[0],dtype=float).reshape(2,2) for k in conics]).reshape(1,-1,2,2)
+    u = np.array([np.asarray(k[1],dtype=float).reshape(2) for k in conics]).reshape(1,-1,2)
+    f = np.array([float(np.ravel(k[2])[0]) for k in conics]).reshape(1,-1)
+    n = np.array([np.asarray(l[0],dtype=float).reshape(2) for l in lines]).reshape(1,-1,2)
+    c = np.array([float(np.ravel(l[1])[0]) for l in lines]).reshape(1,-1)
+    return region_area_batch(V,u,f,n,c,tol)[0]
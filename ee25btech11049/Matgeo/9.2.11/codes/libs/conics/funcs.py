@@ -8,13 +8,16 @@
 #released under GNU GPL
 #Functions related to conics
 
+import os
 import numpy as np
 import numpy.linalg as LA
+from functools import lru_cache
 from .params import *
 
-def conic_param(V,u,f):
+#eig: (lam,P) from LA.eig(V) and Vinv: inverse of V, computed here if not given
+def conic_param(V,u,f,eig=None,Vinv=None):
         # Compute eigenvalues and eigenvectors
-    lam,P = LA.eig(V)
+    lam,P = LA.eig(V) if eig is None else eig
     if lam[1]<=0 or lam[1] < lam[0]:
         lam = ref@lam
         P = ref@P
@@ -40,7 +43,232 @@ def conic_param(V,u,f):
             disc = np.abs((e**2)*(u.T@n)**2-lam[1]*(e**2-1)*(LA.norm(u)**2-lam[1]*f))
             c[i] = (e*(u.T@n)+((-1)**i)*np.sqrt(disc))/(lam[1]*e*(e**2-1))
             F[:,i] = ((c[i]*(e**2)*n-u)/lam[1]).flatten()
-        O = -LA.inv(V)@u
+        O = -(LA.inv(V) if Vinv is None else Vinv)@u
+    return n,c,F,O,lam,P,e
+
+#Conic x^T V x + 2u^T x + f = 0
+#eigenpairs, inverse of V, f0, foci and centre are computed on first use
+#and recomputed after V, u or f is reassigned
+class Conic:
+    __slots__ = ('_V','_u','_f','_eig','_Vinv','_f0','_param')
+
+    def __init__(self,V,u,f):
+        self._V = V
+        self._u = u
+        self._f = f
+        self._clear()
+
+    def _clear(self):
+        self._eig = None
+        self._Vinv = None
+        self._f0 = None
+        self._param = None
+
+    @property
+    def V(self):
+        return self._V
+
+    @V.setter
+    def V(self,V):
+        self._V = V
+        self._clear()
+
+    @property
+    def u(self):
+        return self._u
+
+    @u.setter
+    def u(self,u):
+        self._u = u
+        self._clear()
+
+    @property
+    def f(self):
+        return self._f
+
+    @f.setter
+    def f(self,f):
+        self._f = f
+        self._clear()
+
+    #Eigenvalues and eigenvectors of V, as LA.eig
+    @property
+    def eig(self):
+        if self._eig is None:
+            self._eig = LA.eig(self.V)
+        return self._eig
+
+    @property
+    def Vinv(self):
+        if self._Vinv is None:
+            self._Vinv = LA.inv(self.V)
+        return self._Vinv
+
+    #u^T V^{-1} u - f
+    @property
+    def f0(self):
+        if self._f0 is None:
+            self._f0 = self.u.T@self.Vinv@self.u-self.f
+        return self._f0
+
+    #n,c,F,O,lam,P,e from conic_param, reusing eig and Vinv
+    @property
+    def param(self):
+        if self._param is None:
+            lam,P = self.eig
+            #V is singular for a parabola, whose parameters do not need Vinv
+            Vinv = self.Vinv if np.all(lam != 0) else None
+            self._param = conic_param(self.V,self.u,self.f,(lam,P),Vinv)
+        return self._param
+
+    @property
+    def foci(self):
+        return self.param[2]
+
+    @property
+    def centre(self):
+        return self.param[3]
+
+    #Standard ellipse/hyperbola parameters
+    def ellipse_param(self):
+        lam,P = self.eig
+        ab =np.sqrt(np.abs(self.f0/lam))
+        return ab.flatten()
+
+    #Conic tangent parameters
+    def conic_tangent(self,q):
+        n = self.V@q+self.u
+        c = -(self.u.T@q+self.f)
+        return n,c
+
+    #Points of contact for a pair of tangents
+    def contact(self,h):
+        V,u,f = self.V,self.u,self.f
+        #intermediate
+        gh = h.T@V@h+2*u.T@h+f 
+        
+        #matrix of tangents
+        sigmat = (V@h+u)@(V@h+u).T-gh*V
+        
+        
+        #Spectral decomposition
+        D, P = LA.eig(sigmat)
+        
+        u1 = np.array(([np.sqrt(np.abs(D[1])),np.sqrt(np.abs(D[0]))]))
+        u2 = np.array(([np.sqrt(np.abs(D[1])),-np.sqrt(np.abs(D[0]))]))
+        
+        u1 = u1.reshape(-1,1)
+        u2 = u2.reshape(-1,1)
+        
+        #direction vectors
+        m1 = P@u1
+        m2 = P@u2
+        # Converting 1D array to a 2D numpy array of incompatible shape will cause error
+        m1= np.reshape(m1, (2, 1))
+        m2= np.reshape(m2, (2, 1))
+        mu1 = -(m1.T@(V@h+u))/(m1.T@V@m1)
+        mu2 = -(m2.T@(V@h+u))/(m2.T@V@m2)
+        x1 = h + mu1*m1
+        x2 = h + mu2*m2
+        return(x1,x2)
+
+    #Points of intersection for chords of a conic
+    def chord(self,m,h):
+        V,u,f = self.V,self.u,self.f
+        #intermediate
+        c = h.T@V@h+2*u.T@h+f 
+        b = 2*m.T@(V@h+u)
+        a = m.T@V@m
+        k = np.roots((np.block([a,b,c])).flatten()).reshape(-1,1)
+        Pmat = np.block([k,np.ones((2,1))]).T
+        nmat = np.block([m,h])
+        x = nmat@Pmat
+        return x
+
+    #Conic tangent contact
+    def conic_contact(self,n):
+        V,u,f = self.V,self.u,self.f
+        _,_,_,_,lam,P,e = self.param
+        p = P[:,0].reshape(-1,1)
+        if e==1:
+            #Parabola 
+            r = (p.T@u).flatten()/(p.T@n).flatten()
+            r = r[0]
+            qA = np.block([u+r*n,V]).T
+            qb = np.block([[-f],[r*n-u]])
+            q = LA.lstsq(qA,qb,rcond=None)[0]#vertex
+        else:
+            #ellipse and hyperbola
+            r = np.sqrt(np.abs(self.f0/(n.T@self.Vinv@n)))
+            Pmat = np.array(([1,-1],[-1,-1]))
+            nmat = np.block([r*n,u])
+            q = self.Vinv@nmat@Pmat
+        return q
+
+#Eigenpairs of stacked symmetric 2x2 matrices in closed form
+#V: (K,2,2), returns lam: (K,2) ascending and P: (K,2,2) with eigenvectors as columns
+def eigh2(V):
+    a = V[...,0,0]
+    b = 0.5*(V[...,0,1]+V[...,1,0])
+    d = V[...,1,1]
+    mid = 0.5*(a+d)
+    r = np.hypot(0.5*(a-d),b)
+    lam = np.stack((mid-r,mid+r),axis=-1)
+    th = 0.5*np.arctan2(2*b,a-d)
+    cs = np.cos(th)
+    sn = np.sin(th)
+    P = np.stack((np.stack((-sn,cs),axis=-1),np.stack((cs,sn),axis=-1)),axis=-1)
+    return lam,P
+
+#Inverses of stacked 2x2 matrices in closed form
+def inv2(V):
+    det = V[...,0,0]*V[...,1,1]-V[...,0,1]*V[...,1,0]
+    W = np.empty_like(V,dtype=float)
+    W[...,0,0] = V[...,1,1]
+    W[...,0,1] = -V[...,0,1]
+    W[...,1,0] = -V[...,1,0]
+    W[...,1,1] = V[...,0,0]
+    with np.errstate(divide='ignore',invalid='ignore'):
+        W /= det[...,None,None]
+    return W
+
+#Batched conic_param
+#V: (K,2,2), u: (K,2), f: (K,)
+#returns n: (K,2), c: (K,2), F: (K,2,2) foci as columns, O: (K,2),
+#lam: (K,2), P: (K,2,2), e: (K,); the larger eigenvalue is taken as lam[:,1]
+#parabolas have e == 1 with a single directrix/focus, the second is nan
+def conic_param_batch(V,u,f,tol=1e-12):
+    V = np.asarray(V,dtype=float).reshape(-1,2,2)
+    u = np.asarray(u,dtype=float).reshape(-1,2)
+    f = np.asarray(f,dtype=float).reshape(-1)
+    lam,P = eigh2(V)
+    parab = np.abs(lam[:,0]) <= tol*np.abs(lam[:,1])
+    lam[parab,0] = 0
+    l1 = lam[:,1]
+    e = np.sqrt(1-lam[:,0]/l1)
+    e[parab] = 1
+    p = P[:,:,0]
+    n = np.sqrt(np.abs(l1))[:,None]*p
+    un = np.einsum('ij,ij->i',u,n)
+    uu = np.einsum('ij,ij->i',u,u)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        #ellipse and hyperbola: two directrices and foci
+        disc = np.abs((e**2)*un**2-l1*(e**2-1)*(uu-l1*f))
+        c = (e*un)[:,None]+np.sqrt(disc)[:,None]*np.array([1.0,-1.0])
+        c /= (l1*e*(e**2-1))[:,None]
+        O = -np.einsum('kij,kj->ki',inv2(V),u)
+        #parabola
+        cp = (uu-l1*f)/(2*un)
+    c[parab,0] = cp[parab]
+    c[parab,1] = np.nan
+    F = (c[:,None,:]*(e**2)[:,None,None]*n[:,:,None]-u[:,:,None])/l1[:,None,None]
+    if np.any(parab):
+        #vertex as the least squares solution of the affine parabola equations
+        Vp,up,fp,pp = V[parab],u[parab],f[parab],p[parab]
+        eta = 2*np.einsum('ij,ij->i',up,pp)
+        A = np.concatenate(((up+0.5*eta[:,None]*pp)[:,None,:],Vp),axis=1)
+        b = np.concatenate((-fp[:,None],0.5*eta[:,None]*pp-up),axis=1)
+        O[parab] = np.einsum('kij,kj->ki',inv2(np.einsum('kji,kjl->kil',A,A)),np.einsum('kji,kj->ki',A,b))
     return n,c,F,O,lam,P,e
 
 #Standard parabola parameters
@@ -53,43 +281,130 @@ def parab_param(lam,P,u):
 
 #Standard ellipse/hyperbola parameters
 def ellipse_param(V,u,f):
-    lam,P = LA.eig(V)
-    f0=u.T@LA.inv(V)@u-f
-    ab =np.sqrt(np.abs(f0/lam))
-    return ab.flatten()
+    return Conic(V,u,f).ellipse_param()
+
+#Unit circle samples (cos, sin) over [0, 2pi], cached by sample count
+@lru_cache(maxsize=64)
+def unit_circ(num):
+	theta = np.linspace(0,2*np.pi,num)
+	x_circ = np.vstack((np.cos(theta),np.sin(theta)))
+	x_circ.flags.writeable = False
+	return x_circ
 
 #Generating points on a circle
 def circ_gen(O,r):
-	len = 50
-	theta = np.linspace(0,2*np.pi,len)
-	x_circ = np.zeros((2,len))
-	x_circ[0,:] = r*np.cos(theta)
-	x_circ[1,:] = r*np.sin(theta)
-	x_circ = (x_circ + O)
-	return x_circ
+	return circ_gen_num(O,r,50)
 
 def circ_gen_num(O,r,num):
-	theta = np.linspace(0,2*np.pi,num)
-	x_circ = np.zeros((2,num))
-	x_circ[0,:] = r*np.cos(theta)
-	x_circ[1,:] = r*np.sin(theta)
+	x_circ = r*unit_circ(num)
 	x_circ = (x_circ + O)
 	return x_circ
+
+#Generating points on many circles
+#O: (K,2) centres, r: (K,) radii, returns (K,2,num)
+def circ_gen_batch(O,r,num=50,out=None):
+	O = np.asarray(O,dtype=float).reshape(-1,2)
+	r = np.asarray(r,dtype=float).reshape(-1)
+	if out is None:
+		out = np.empty((O.shape[0],2,num))
+	np.multiply(r[:,None,None],unit_circ(num),out=out)
+	out += O[:,:,None]
+	return out
+
 #Generating points on an ellipse
 def ellipse_gen(a,b):
-	len = 50
-	theta = np.linspace(0,2*np.pi,len)
-	x_ellipse = np.zeros((2,len))
-	x_ellipse[0,:] = a*np.cos(theta)
-	x_ellipse[1,:] = b*np.sin(theta)
-	return x_ellipse
+	return ellipse_gen_num(a,b,50)
 
 def ellipse_gen_num(a,b,num):
-	theta = np.linspace(0,2*np.pi,num)
-	x_ellipse = np.zeros((2,num))
-	x_ellipse[0,:] = a*np.cos(theta)
-	x_ellipse[1,:] = b*np.sin(theta)
+	ab = np.array([np.ravel(a)[0],np.ravel(b)[0]],dtype=float)
+	x_ellipse = ab[:,None]*unit_circ(num)
 	return x_ellipse
+
+#Generating points on many ellipses
+#a,b: (K,) semi-axes, returns (K,2,num)
+def ellipse_gen_batch(a,b,num=50,out=None):
+	ab = np.stack((np.asarray(a,dtype=float).reshape(-1),np.asarray(b,dtype=float).reshape(-1)),axis=-1)
+	if out is None:
+		out = np.empty((ab.shape[0],2,num))
+	np.multiply(ab[:,:,None],unit_circ(num),out=out)
+	return out
+
+#Conic with directrix n^T x = c, focus F and eccentricity e
+def conic_from_param(n,c,F,e):
+    n = np.asarray(n,dtype=float).reshape(-1,1)
+    F = np.asarray(F,dtype=float).reshape(-1,1)
+    nn = (n.T@n)[0,0]
+    V = nn*np.eye(2)-(e**2)*n@n.T
+    u = c*(e**2)*n-nn*F
+    f = nn*(F.T@F)[0,0]-(c**2)*(e**2)
+    return V,u,f
+
+#Parameter refinement until every chord is within tol of the curve
+#curve maps (n,) parameters to (2,n) points
+def _adapt_gen(curve,t0,t1,tol,num=8,maxlev=40):
+    t = np.linspace(t0,t1,num+1)
+    x = curve(t)
+    for lev in range(maxlev):
+        tm = 0.5*(t[:-1]+t[1:])
+        xm = curve(tm)
+        d = x[:,1:]-x[:,:-1]
+        w = xm-x[:,:-1]
+        dev = np.abs(d[0]*w[1]-d[1]*w[0])/np.maximum(np.hypot(d[0],d[1]),1e-300)
+        split = dev > tol
+        if not np.any(split):
+            break
+        k = np.flatnonzero(split)+1
+        t = np.insert(t,k,tm[split])
+        x = np.insert(x,k,xm[:,split],axis=1)
+    return x
+
+#Points on a conic placed by a chord deviation tolerance in data units
+#V,u,f: conic arrays or a Conic; reach bounds open curves around the
+#centre (hyperbola) or vertex (parabola)
+#returns a list of (2,n) branches
+def conic_gen_adapt(V,u,f,tol=1e-3,reach=10.0):
+    if isinstance(V,Conic):
+        V,u,f = V.V,V.u,V.f
+    V = np.asarray(V,dtype=float)
+    u = np.asarray(u,dtype=float).reshape(-1)
+    f = float(np.ravel(f)[0])
+    lam,P = eigh2(V)
+    if np.abs(lam[0]) <= 1e-12*np.abs(lam[1]):
+        #parabola in the frame x = s q + w p of V's eigenvectors
+        p,q = P[:,0],P[:,1]
+        up,uq = u@p,u@q
+        if up == 0:
+            raise ValueError('degenerate parabola')
+        s0 = -uq/lam[1]
+        def curve(s):
+            w = -(lam[1]*s**2+2*uq*s+f)/(2*up)
+            return np.outer(q,s)+np.outer(p,w)
+        return [_adapt_gen(curve,s0-reach,s0+reach,tol)]
+    O = -inv2(V)@u
+    f0 = -u@O-f
+    if f0 == 0 or (lam[0]*lam[1] > 0 and f0*lam[0] < 0):
+        raise ValueError('degenerate or imaginary conic')
+    if lam[0]*lam[1] > 0:
+        #ellipse
+        ab = np.sqrt(f0/lam)
+        def curve(t):
+            return O[:,None]+P@(ab[:,None]*np.vstack((np.cos(t),np.sin(t))))
+        return [_adapt_gen(curve,0,2*np.pi,tol)]
+    #hyperbola, transverse axis i
+    i = 0 if f0/lam[0] > 0 else 1
+    a = np.sqrt(f0/lam[i])
+    b = np.sqrt(-f0/lam[1-i])
+    T = np.arccosh(max(reach/a,1.0))
+    x_br = []
+    for sgn in (1,-1):
+        def curve(t,sgn=sgn):
+            y = np.empty((2,t.shape[0]))
+            y[i] = sgn*a*np.cosh(t)
+            y[1-i] = b*np.sinh(t)
+            return O[:,None]+P@y
+        x_br.append(_adapt_gen(curve,-T,T,tol))
+    return x_br
+
 #Generating points on a parabola
 def parab_gen(y,a):
 	x = y**2/a
@@ -102,53 +417,428 @@ def hyper_gen(y):
 
 #Points of contact for a pair of tangents
 def contact(V,u,f,h):
-    #intermediate
-    gh = h.T@V@h+2*u.T@h+f 
-    
-    #matrix of tangents
-    sigmat = (V@h+u)@(V@h+u).T-gh*V
-    
-    
-    #Spectral decomposition
-    D, P = LA.eig(sigmat)
-    
-    u1 = np.array(([np.sqrt(np.abs(D[1])),np.sqrt(np.abs(D[0]))]))
-    u2 = np.array(([np.sqrt(np.abs(D[1])),-np.sqrt(np.abs(D[0]))]))
-    
-    u1 = u1.reshape(-1,1)
-    u2 = u2.reshape(-1,1)
-    
-    #direction vectors
-    m1 = P@u1
-    m2 = P@u2
-    #print(m1,m2)
-    # Converting 1D array to a 2D numpy array of incompatible shape will cause error
-    m1= np.reshape(m1, (2, 1))
-    m2= np.reshape(m2, (2, 1))
-    mu1 = -(m1.T@(V@h+u))/(m1.T@V@m1)
-    mu2 = -(m2.T@(V@h+u))/(m2.T@V@m2)
-    #print(mu1,mu2)
-    x1 = h + mu1*m1
-    x2 = h + mu2*m2
-    return(x1,x2)
+    return Conic(V,u,f).contact(h)
     
 #Points of intersection for chords of a conic
 def chord(V,u,f,m,h):
-    #intermediate
-    c = h.T@V@h+2*u.T@h+f 
-    b = 2*m.T@(V@h+u)
-    a = m.T@V@m
-    k = np.roots((np.block([a,b,c])).flatten()).reshape(-1,1)
-    Pmat = np.block([k,np.ones((2,1))]).T
-    #print(Pmat,k)
-    nmat = np.block([m,h])
-    x = nmat@Pmat
-    #x1 = h+k[0]*m
-    #x2 = h+k[1]*m
-    #return x1,x2
-    return x
+    return Conic(V,u,f).chord(m,h)
     
     
+#Points of contact for pairs of tangents from many points
+#V,u,f: one conic ((2,2),(2,1),scalar or a Conic) or K conics ((K,2,2),(K,2),(K,))
+#h: (N,2), returns x1,x2: (N,2) or (K,N,2) and a mask of points with no
+#real tangents (inside the conic), whose contact points are nan
+def contact_batch(V,u,f,h,tol=1e-12):
+    if isinstance(V,Conic):
+        V,u,f = V.V,V.u,V.f
+    V = np.asarray(V,dtype=float)
+    one = V.ndim == 2
+    V = V.reshape(-1,1,2,2)
+    u = np.asarray(u,dtype=float).reshape(-1,1,2)
+    f = np.asarray(f,dtype=float).reshape(-1,1)
+    h = np.asarray(h,dtype=float).reshape(1,-1,2)
+    g = np.einsum('knij,knj->kni',V,h)+u
+    gh = np.einsum('kni,kni->kn',h,g+u)+f
+    #matrix of tangents
+    sigmat = g[...,:,None]*g[...,None,:]-gh[...,None,None]*V
+    D,P = eigh2(sigmat)
+    inside = D[...,0]*D[...,1] > tol*(D[...,0]**2+D[...,1]**2)
+    s0 = np.sqrt(np.abs(D[...,1]))[...,None]*P[...,:,0]
+    s1 = np.sqrt(np.abs(D[...,0]))[...,None]*P[...,:,1]
+    x = []
+    for m in (s0+s1,s0-s1):
+        with np.errstate(divide='ignore',invalid='ignore'):
+            mu = -np.einsum('kni,kni->kn',m,g)/np.einsum('kni,knij,knj->kn',m,V,m)
+        xi = h+mu[...,None]*m
+        xi[inside] = np.nan
+        x.append(xi)
+    if one:
+        return x[0][0],x[1][0],inside[0]
+    return x[0],x[1],inside
+
+#Intersection of many lines x = h + k m with one conic
+#V,u,f: conic arrays or a Conic, or (N,2,2),(N,2),(N,) conics paired with the lines
+#m,h: (N,2), returns x: (N,2,2) with x[:,i] the i-th point, k: (N,2) and
+#cls: (N,) 0 miss, 1 tangent, 2 secant, 3 single point (k^2 term vanishes)
+def chord_batch(V,u,f,m,h,tol=1e-12):
+    if isinstance(V,Conic):
+        V,u,f = V.V,V.u,V.f
+    V = np.asarray(V,dtype=float)
+    u = np.asarray(u,dtype=float).reshape(V.shape[:-2]+(2,))
+    f = np.asarray(f,dtype=float).reshape(V.shape[:-2])
+    m = np.asarray(m,dtype=float).reshape(-1,2)
+    h = np.asarray(h,dtype=float).reshape(-1,2)
+    Vm = np.einsum('...ij,...j->...i',V,m)
+    Vh = np.einsum('...ij,...j->...i',V,h)
+    a = np.einsum('ij,ij->i',m,Vm)
+    b = np.einsum('ij,ij->i',m,Vh+u)
+    c = np.einsum('ij,ij->i',h,Vh+2*u)+f
+    #a k^2 + 2b k + c = 0
+    disc = b*b-a*c
+    lin = np.abs(a) <= tol*np.einsum('ij,ij->i',m,m)*np.abs(V).max(axis=(-2,-1))
+    tang = ~lin & (np.abs(disc) <= tol*(b*b+np.abs(a*c)))
+    cls = np.where(disc > 0,2,0).astype(np.int8)
+    cls[tang] = 1
+    with np.errstate(divide='ignore',invalid='ignore'):
+        q = -(b+np.copysign(np.sqrt(np.where(tang,0,disc)),b))
+        k = np.stack((q/a,np.where(q == 0,0,c/q)),axis=-1)
+        k[lin] = (-0.5*c[lin]/b[lin])[:,None]*np.array([1.0,np.nan])
+    cls[lin] = np.where(np.isfinite(k[lin,0]),3,0)
+    k[cls == 0] = np.nan
+    k[cls == 2] = np.sort(k[cls == 2],axis=1)
+    x = h[:,None,:]+k[:,:,None]*m[:,None,:]
+    return x,k,cls
+
+#3x3 matrices [[V,u],[u^T,f]] of stacked conics
+def conic_mat(V,u,f):
+    V = np.asarray(V,dtype=float).reshape(-1,2,2)
+    C = np.empty((V.shape[0],3,3))
+    C[:,:2,:2] = V
+    C[:,:2,2] = C[:,2,:2] = np.asarray(u,dtype=float).reshape(-1,2)
+    C[:,2,2] = np.asarray(f,dtype=float).reshape(-1)
+    return C
+
+#Adjugates of stacked 3x3 matrices
+def _adj3(D):
+    B = np.empty_like(D)
+    for i in range(3):
+        for j in range(3):
+            r = [k for k in range(3) if k != j]
+            c = [k for k in range(3) if k != i]
+            B[:,i,j] = (-1)**(i+j)*(D[:,r[0],c[0]]*D[:,r[1],c[1]]-D[:,r[0],c[1]]*D[:,r[1],c[0]])
+    return B
+
+#Points x = h + k m on homogeneous lines l0 x + l1 y + l2 = 0
+def _line_pt_dir(l):
+    n = l[:,:2]
+    with np.errstate(divide='ignore',invalid='ignore'):
+        h = -(l[:,2]/np.einsum('ij,ij->i',n,n))[:,None]*n
+    m = n@omat.T
+    return m,h
+
+#Intersection of conic pairs (V1[i],u1[i],f1[i]) and (V2[i],u2[i],f2[i])
+#a degenerate member D = C1 + l C2 of the pencil is found from the cubic
+#det(C1 + l C2) = 0, split into two lines, and each line is intersected with
+#conic 1; pairs of circles use the radical line instead
+#returns x: (K,4,2) nan padded and mult: (K,4) multiplicities, 0 where empty
+def conic_isect(V1,u1,f1,V2,u2,f2,tol=1e-9):
+    C1 = conic_mat(V1,u1,f1)
+    C2 = conic_mat(V2,u2,f2)
+    K = C1.shape[0]
+    x = np.full((K,4,2),np.nan)
+    mult = np.zeros((K,4),dtype=np.int8)
+    iso = lambda C: (C[:,0,1] == 0) & (C[:,0,0] == C[:,1,1]) & (C[:,0,0] != 0)
+    circ = iso(C1) & iso(C2)
+    if np.any(circ):
+        #radical line of the normalised circles
+        A = C1[circ]/C1[circ,:1,:1]
+        B = C2[circ]/C2[circ,:1,:1]
+        l = np.stack((2*(A[:,0,2]-B[:,0,2]),2*(A[:,1,2]-B[:,1,2]),A[:,2,2]-B[:,2,2]),axis=-1)
+        m,h = _line_pt_dir(l)
+        xc,_,cls = chord_batch(A[:,:2,:2],A[:,:2,2],A[:,2,2],m,h)
+        mc = np.where(cls[:,None] == 1,[2,0],np.where(cls[:,None] == 3,[1,0],np.where(cls[:,None] == 2,1,0)))
+        xc[mc == 0] = np.nan
+        x[circ,:2] = xc
+        mult[circ,:2] = mc
+    gen = np.flatnonzero(~circ)
+    if gen.size == 0:
+        return x,mult
+    A,B = C1[gen],C2[gen]
+    #det(A + l B) = a3 l^3 + a2 l^2 + a1 l + a0
+    a0 = LA.det(A)
+    a3 = LA.det(B)
+    a1 = np.zeros_like(a0)
+    a2 = np.zeros_like(a0)
+    for i in range(3):
+        T = A.copy()
+        T[:,:,i] = B[:,:,i]
+        a1 += LA.det(T)
+        T = B.copy()
+        T[:,:,i] = A[:,:,i]
+        a2 += LA.det(T)
+    #solve in l for D = A + l B, or in 1/l for D = l A + B
+    flip = np.abs(a0) > np.abs(a3)
+    cf = np.where(flip[:,None],np.stack((a0,a1,a2,a3),axis=-1),np.stack((a3,a2,a1,a0),axis=-1))
+    comp = np.zeros((gen.size,3,3))
+    comp[:,0,:] = -cf[:,1:]/cf[:,:1]
+    comp[:,1,0] = comp[:,2,1] = 1
+    with np.errstate(invalid='ignore'):
+        rts = LA.eigvals(np.nan_to_num(comp))
+    real = np.abs(rts.imag) <= 1e-8*(1+np.abs(rts.real))
+    rts = rts.real
+    #pick the real root whose degenerate conic is a real line pair
+    best = np.full(gen.size,-np.inf)
+    D = np.zeros_like(A)
+    for r in range(3):
+        Dr = np.where(flip[:,None,None],rts[:,r,None,None]*A+B,A+rts[:,r,None,None]*B)
+        Br = _adj3(Dr)
+        nD = np.abs(Dr).max(axis=(1,2))
+        score = -np.trace(Br,axis1=1,axis2=2)/(np.abs(Br).max(axis=(1,2))+1e-12*nD**2)
+        score[~real[:,r]] = -np.inf
+        take = score > best
+        best[take] = score[take]
+        D[take] = Dr[take]
+    #split D into lines g, h
+    Bd = _adj3(D)
+    dg = np.diagonal(Bd,axis1=1,axis2=2)
+    i = np.argmin(dg,axis=1)
+    bii = dg[np.arange(gen.size),i]
+    rank1 = -bii <= tol*np.abs(D).max(axis=(1,2))**2
+    with np.errstate(divide='ignore',invalid='ignore'):
+        p = Bd[np.arange(gen.size),:,i]/np.sqrt(-bii)[:,None]
+    p[rank1] = 0
+    Mp = np.zeros_like(D)
+    Mp[:,0,1],Mp[:,0,2],Mp[:,1,2] = p[:,2],-p[:,1],p[:,0]
+    Mp -= np.transpose(Mp,(0,2,1))
+    G = D+Mp
+    idx = np.argmax(np.abs(G).reshape(gen.size,-1),axis=1)
+    gi,gj = np.divmod(idx,3)
+    lines = (G[np.arange(gen.size),gi,:],G[np.arange(gen.size),:,gj])
+    pts = []
+    mul = []
+    for l in lines:
+        m,h = _line_pt_dir(l)
+        xl,_,cls = chord_batch(A[:,:2,:2],A[:,:2,2],A[:,2,2],m,h)
+        xl[cls == 0] = np.nan
+        pts.append(xl)
+        mul.append(np.where(cls[:,None] == 1,[2,0],np.where(cls[:,None] == 3,[1,0],np.where(cls[:,None] == 2,1,0))))
+    xg = np.concatenate(pts,axis=1)
+    mg = np.concatenate(mul,axis=1).astype(np.int8)
+    xg[mg == 0] = np.nan
+    #a double line meets the conic twice at each point
+    mg[rank1,:2] *= 2
+    mg[rank1,2:] = 0
+    xg[rank1,2:] = np.nan
+    #points shared by both lines are counted once with their multiplicities added
+    scale = max(np.nanmax(np.abs(xg)) if np.any(mg) else 1.0,1.0)
+    for a in range(2):
+        for b in range(2,4):
+            same = (mg[:,a] > 0) & (mg[:,b] > 0) & (np.hypot(*(xg[:,a]-xg[:,b]).T) <= 1e-6*scale)
+            mg[same,a] += mg[same,b]
+            mg[same,b] = 0
+            xg[same,b] = np.nan
+    x[gen] = xg
+    mult[gen] = mg
+    return x,mult
+
+#Intersections of every pair i < j among K conics
+#returns pairs: (P,2) indices, x: (P,4,2) and mult: (P,4) as conic_isect
+def conic_isect_all(V,u,f,tol=1e-9):
+    V = np.asarray(V,dtype=float).reshape(-1,2,2)
+    u = np.asarray(u,dtype=float).reshape(-1,2)
+    f = np.asarray(f,dtype=float).reshape(-1)
+    i,j = np.triu_indices(V.shape[0],1)
+    x,mult = conic_isect(V[i],u[i],f[i],V[j],u[j],f[j],tol)
+    return np.stack((i,j),axis=-1),x,mult
+
+#Values of x^T V x + 2u^T x + f over (N,2) points, chunk rows at a time
+#X: (N,2) array or the path of a .npy file, which is memory-mapped
+#V,u,f: one conic ((2,2),(2,1),scalar or a Conic) or K conics ((K,2,2),(K,2),(K,))
+#returns (N,) or (K,N) int8 labels -1 inside, 0 on (|g| <= tol), 1 outside,
+#or the float values themselves if labels=False
+def conic_classify(V,u,f,X,labels=True,tol=1e-12,chunk=1<<20,out=None):
+    if isinstance(V,Conic):
+        V,u,f = V.V,V.u,V.f
+    if isinstance(X,(str,os.PathLike)):
+        X = np.load(X,mmap_mode='r')
+    V = np.asarray(V,dtype=float)
+    one = V.ndim == 2
+    V = V.reshape(-1,2,2)
+    u = np.asarray(u,dtype=float).reshape(-1,2)
+    f = np.asarray(f,dtype=float).reshape(-1)
+    K = V.shape[0]
+    N = X.shape[0]
+    if out is None:
+        out = np.empty((K,N),dtype=np.int8 if labels else float)
+    res = out.reshape(K,N)
+    for i0 in range(0,N,chunk):
+        blk = np.asarray(X[i0:i0+chunk],dtype=float)
+        x = blk[:,0]
+        y = blk[:,1]
+        for k in range(K):
+            a,b,d = V[k,0,0],V[k,0,1]+V[k,1,0],V[k,1,1]
+            #(a x + b y + 2u0) x + (d y + 2u1) y + f
+            g = a*x
+            g += b*y
+            g += 2*u[k,0]
+            g *= x
+            t = d*y
+            t += 2*u[k,1]
+            t *= y
+            g += t
+            g += f[k]
+            if labels:
+                res[k,i0:i0+chunk] = (g > tol).astype(np.int8)-(g < -tol)
+            else:
+                res[k,i0:i0+chunk] = g
+    return res[0] if one else res
+
+#Least squares conic fit accumulated over chunks of points
+#only the 6x6 scatter matrix of (x^2, xy, y^2, x, y, 1) is kept; points
+#are shifted and scaled by the first chunk for conditioning
+class ConicFit:
+    __slots__ = ('S','num','m','s')
+
+    def __init__(self):
+        self.S = np.zeros((6,6))
+        self.num = 0
+        self.m = None
+        self.s = None
+
+    #Add (N,2) points
+    def update(self,X):
+        X = np.asarray(X,dtype=float).reshape(-1,2)
+        if X.shape[0] == 0:
+            return self
+        if self.m is None:
+            self.m = X.mean(axis=0)
+            self.s = np.sqrt(((X-self.m)**2).sum(axis=1).mean()) or 1.0
+        x = (X[:,0]-self.m[0])/self.s
+        y = (X[:,1]-self.m[1])/self.s
+        D = np.stack((x*x,x*y,y*y,x,y,np.ones_like(x)),axis=1)
+        self.S += D.T@D
+        self.num += X.shape[0]
+        return self
+
+    #Solve the constrained eigenproblem
+    #method 'ellipse': 4ac - b^2 = 1 (Fitzgibbon, Halir-Flusser form)
+    #method 'general': unit coefficient vector
+    #returns V,u,f as used by conic_param, scaled so the larger eigenvalue of V is 1
+    def fit(self,method='ellipse'):
+        if self.num < 5:
+            raise ValueError('at least 5 points are needed')
+        S = self.S
+        if method == 'ellipse':
+            S1,S2,S3 = S[:3,:3],S[:3,3:],S[3:,3:]
+            T = -LA.solve(S3,S2.T)
+            M = S1+S2@T
+            M = np.array([M[2]/2,-M[1],M[0]/2])
+            w,v = LA.eig(M)
+            v = np.real(v)
+            cond = 4*v[0]*v[2]-v[1]**2
+            a1 = v[:,np.argmax(cond)]
+            a = np.concatenate((a1,T@a1))
+        elif method == 'general':
+            a = LA.eigh(S)[1][:,0]
+        else:
+            raise ValueError('unknown method '+method)
+        Vn = np.array([[a[0],a[1]/2],[a[1]/2,a[2]]])
+        un = np.array([a[3]/2,a[4]/2])
+        #undo the shift and scale
+        m,s = self.m,self.s
+        V = Vn/s**2
+        u = un/s-Vn@m/s**2
+        f = m@Vn@m/s**2-2*un@m/s+a[5]
+        k = LA.eigvalsh(V)
+        k = k[np.argmax(np.abs(k))]
+        return V/k,(u/k).reshape(-1,1),f/k
+
+#Fit a conic to an iterable of (N,2) chunks in constant memory
+def conic_fit(chunks,method='ellipse'):
+    fit = ConicFit()
+    for X in chunks:
+        fit.update(X)
+    return fit.fit(method)
+
+#Nearest points on a conic to many points
+#central conics: in the eigenframe the foot is y_i = q_i/(1 + t a_i) with
+#a_i = lam_i/f0, and t is the root of sum a_i y_i^2 = 1 between the poles,
+#found by Newton iteration safeguarded by bisection, per point
+#parabolas: the stationarity condition is a cubic, solved in closed form
+#returns feet x: (N,2), signed distances d: (N,) (negative where g(q) < 0)
+#and a mask of points whose iteration converged
+def conic_dist(V,u,f,Q,tol=1e-14,maxiter=100):
+    if isinstance(V,Conic):
+        V,u,f = V.V,V.u,V.f
+    V = np.asarray(V,dtype=float)
+    u = np.asarray(u,dtype=float).reshape(-1)
+    f = float(np.ravel(f)[0])
+    Q = np.asarray(Q,dtype=float).reshape(-1,2)
+    N = Q.shape[0]
+    lam,P = eigh2(V)
+    conv = np.ones(N,dtype=bool)
+    if np.abs(lam[0]) <= 1e-12*np.abs(lam[1]):
+        #parabola w = -k s^2 about the vertex, s along q and w along p
+        p,q = P[:,0],P[:,1]
+        up,uq = u@p,u@q
+        s0 = -uq/lam[1]
+        w0 = -(lam[1]*s0**2+2*uq*s0+f)/(2*up)
+        O = s0*q+w0*p
+        k = lam[1]/(2*up)
+        sg = (Q-O)@q
+        om = (Q-O)@p
+        #2k^2 s^3 + (1 + 2k om) s - sg = 0
+        a3 = 2*k**2
+        pc = (1+2*k*om)/a3
+        qc = -sg/a3
+        disc = (qc/2)**2+(pc/3)**3
+        y = np.empty(N)
+        one = disc >= 0
+        sd = np.sqrt(disc[one])
+        y[one] = np.cbrt(-qc[one]/2+sd)+np.cbrt(-qc[one]/2-sd)
+        three = ~one
+        if np.any(three):
+            r = 2*np.sqrt(-pc[three]/3)
+            phi = np.arccos(np.clip(3*qc[three]/(pc[three]*r),-1,1))/3
+            roots = r[:,None]*np.cos(phi[:,None]-2*np.pi*np.arange(3)/3)
+            dist = (roots-sg[three,None])**2+(k*roots**2+om[three,None])**2
+            y[three] = roots[np.arange(roots.shape[0]),np.argmin(dist,axis=1)]
+        x = O+np.outer(y,q)-np.outer(k*y**2,p)
+    else:
+        O = -inv2(V)@u
+        f0 = -u@O-f
+        if f0 == 0:
+            raise ValueError('degenerate conic')
+        al = lam/f0
+        z = (Q-O)@P
+        z2 = z**2
+        #bracket where 1 + t a_i > 0 for both axes
+        pos = al > 0
+        lo = np.max(-1/al[pos]) if np.any(pos) else -np.inf
+        hi = np.min(-1/al[~pos]) if np.any(~pos) else np.inf
+        if not np.any(pos):
+            raise ValueError('imaginary conic')
+        lo = np.full(N,lo)
+        hi = np.full(N,hi) if np.isfinite(hi) else np.full(N,lo[0])+np.sqrt((z2/al[pos].min()).sum(axis=1))+1
+        def F(t,z2):
+            den = 1+t[:,None]*al
+            return (al*z2/den**2).sum(axis=1)-1,(-2*al**2*z2/den**3).sum(axis=1)
+        t = 0.5*(lo+hi)
+        conv[:] = False
+        act = np.arange(N)
+        for it in range(maxiter):
+            ta = t[act]
+            Fa,dF = F(ta,z2[act])
+            #F decreases across the bracket
+            up_ = Fa > 0
+            lo[act[up_]] = ta[up_]
+            hi[act[~up_]] = ta[~up_]
+            with np.errstate(divide='ignore',invalid='ignore'):
+                tn = ta-Fa/dF
+            bad = ~np.isfinite(tn) | (tn < lo[act]) | (tn > hi[act])
+            tn[bad] = 0.5*(lo[act[bad]]+hi[act[bad]])
+            t[act] = tn
+            done = (np.abs(tn-ta) <= tol*(1+np.abs(tn))) | (Fa == 0)
+            conv[act[done]] = True
+            act = act[~done]
+            if act.size == 0:
+                break
+        with np.errstate(divide='ignore',invalid='ignore'):
+            y = z/(1+t[:,None]*al)
+        #points on an axis whose foot sits at a pole: y_i from the constraint
+        for i in range(2):
+            j = 1-i
+            pole = ~np.isfinite(y[:,i]) | (np.abs(1+t*al[i]) <= 1e-9)
+            if np.any(pole):
+                yj = z[pole,j]/(1-al[j]/al[i])
+                y[pole,j] = yj
+                y[pole,i] = np.copysign(np.sqrt(np.maximum(0,(1-al[j]*yj**2)/al[i])),z[pole,i])
+                conv[pole] = True
+        x = O+y@P.T
+    gq = np.einsum('ni,ij,nj->n',Q,V,Q)+2*Q@u+f
+    d = np.sign(gq)*np.hypot(*(Q-x).T)
+    return x,d,conv
+
 #Circle parameters
 def circ_param(u,f):
     O = -u
@@ -164,30 +854,8 @@ def circ_tang(n,u,r):
 
 #Conic tangent parameters
 def conic_tangent(V,u,f,q):
-    n = V@q+u
-    c = -(u.T@q+f)
-    #n = V@q+u
-    #c = n.T@q
-    return n,c
+    return Conic(V,u,f).conic_tangent(q)
 
 #Conic tangent contact
 def conic_contact(V,u,f,n):
-    _,_,_,_,lam,P,e = conic_param(V,u,f)
-    p = P[:,0].reshape(-1,1)
-    if e==1:
-        #Parabola 
-        r = (p.T@u).flatten()/(p.T@n).flatten()
-        r = r[0]
-        print(r)
-        qA = np.block([u+r*n,V]).T
-        qb = np.block([[-f],[r*n-u]])
-        q = LA.lstsq(qA,qb,rcond=None)[0]#vertex
-        print(qA,qb)
-    else:
-        #ellipse and hyperbola
-        f0=u.T@LA.inv(V)@u-f
-        r = np.sqrt(np.abs(f0/(n.T@LA.inv(V)@n)))
-        Pmat = np.array(([1,-1],[-1,-1]))
-        nmat = np.block([r*n,u])
-        q = LA.inv(V)@nmat@Pmat
-    return q
+    return Conic(V,u,f).conic_contact(n)
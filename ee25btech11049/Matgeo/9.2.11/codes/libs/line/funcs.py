@@ -21,26 +21,52 @@ def ang_vec(m1,m2):
     return np.arccos(float((m1.T@m2)/(np.linalg.norm(m1)*np.linalg.norm(m2))))
     #return mp.acos(float((m1.T@m2)/(np.linalg.norm(m1)*np.linalg.norm(m2))))
 
+#Direction cosines of the rows of M
+def dir_cos(M):
+  M = np.asarray(M,dtype=float)
+  return M/np.linalg.norm(M,axis=-1,keepdims=True)
+
+#Angles between every row of M1 (N,dim) and every row of M2 (M,dim)
+#returns (N,M) angles, or cosines if cos=True, computed chunk rows at a time
+def ang_mat(M1,M2,cos=False,chunk=4096,out=None):
+  U1 = dir_cos(M1)
+  U2 = dir_cos(M2)
+  if out is None:
+    out = np.empty((U1.shape[0],U2.shape[0]))
+  for i0 in range(0,U1.shape[0],chunk):
+    blk = out[i0:i0+chunk]
+    np.matmul(U1[i0:i0+chunk],U2.T,out=blk)
+    np.clip(blk,-1,1,out=blk)
+    if not cos:
+      np.arccos(blk,out=blk)
+  return out
+
+#Angles between M1[i] and M2[i]
+def ang_pairs(M1,M2,cos=False):
+  t = np.einsum('ij,ij->i',dir_cos(M1),dir_cos(M2))
+  np.clip(t,-1,1,out=t)
+  return t if cos else np.arccos(t)
+
 #Generate line points
 def line_gen(A,B):
-  len =10
-  dim = A.shape[0]
-  x_AB = np.zeros((dim,len))
-  lam_1 = np.linspace(0,1,len)
-  for i in range(len):
-    temp1 = A + lam_1[i]*(B-A)
-    x_AB[:,i]= temp1.T
-  return x_AB
+  return line_gen_num(A,B,10)
 
 #Generate line points
 def line_gen_num(A,B,num):
-  dim = A.shape[0]
-  x_AB = np.zeros((dim,num))
+  return line_gen_batch(A.reshape(1,-1),B.reshape(1,-1),num)[0]
+
+#Generate points on a stack of segments
+#A,B: (N,dim) endpoints, returns (N,dim,num)
+def line_gen_batch(A,B,num=10,out=None):
   lam_1 = np.linspace(0,1,num)
-  for i in range(num):
-    temp1 = A + lam_1[i]*(B-A)
-    x_AB[:,i]= temp1.T
-  return x_AB
+  A = np.asarray(A,dtype=float)
+  B = np.asarray(B,dtype=float)
+  if out is None:
+    out = np.empty(A.shape+(num,))
+  np.multiply((B-A)[:,:,None],lam_1,out=out)
+  out += A[:,:,None]
+  return out
+
 #Generating line in 2D using normal form
 def line_norm(n,c,k1,k2):
     c = c/LA.norm(n)
@@ -73,14 +99,19 @@ def param_norm(n,c):
 
 #Generating line using parametric form
 def line_dir_pt(m,A,k1,k2):
-  len = 10
-  dim = A.shape[0]
-  x_AB = np.zeros((dim,len))
-  lam_1 = np.linspace(k1,k2,len)
-  for i in range(len):
-    temp1 = A + lam_1[i]*m
-    x_AB[:,i]= temp1.T
-  return x_AB
+  return line_dir_pt_batch(m.reshape(1,-1),A.reshape(1,-1),k1,k2)[0]
+
+#Generating lines using parametric form
+#m,A: (N,dim) directions and points, returns (N,dim,num)
+def line_dir_pt_batch(m,A,k1,k2,num=10,out=None):
+  lam_1 = np.linspace(k1,k2,num)
+  m = np.asarray(m,dtype=float)
+  A = np.asarray(A,dtype=float)
+  if out is None:
+    out = np.empty(A.shape+(num,))
+  np.multiply(m[:,:,None],lam_1,out=out)
+  out += A[:,:,None]
+  return out
 
 #Intersection of two lines
 def line_isect(n1,c1,n2,c2):
@@ -103,6 +134,81 @@ def line_intersect(n1,A1,n2,A2):
   return P
 
 
+#Lines n^T x = c stored as contiguous arrays
+#n: (N,2) normals, c: (N,) offsets
+class LineSet:
+  __slots__ = ('n','c')
+
+  def __init__(self,n,c):
+    self.n = np.ascontiguousarray(np.asarray(n,dtype=float).reshape(-1,2))
+    self.c = np.ascontiguousarray(np.asarray(c,dtype=float).reshape(-1))
+
+  def __len__(self):
+    return self.c.shape[0]
+
+  def __getitem__(self,k):
+    return LineSet(self.n[k],self.c[k])
+
+  #Lines through point pairs, as norm_vec(A,B)
+  #A,B: (N,2)
+  @classmethod
+  def from_points(cls,A,B):
+    A = np.asarray(A,dtype=float).reshape(-1,2)
+    B = np.asarray(B,dtype=float).reshape(-1,2)
+    n = dir_vec(A,B)@omat.T
+    return cls(n,np.einsum('ij,ij->i',n,A))
+
+  #Lines x = A + k m
+  #m,A: (N,2)
+  @classmethod
+  def from_param(cls,m,A):
+    m = np.asarray(m,dtype=float).reshape(-1,2)
+    A = np.asarray(A,dtype=float).reshape(-1,2)
+    n = m@omat.T
+    return cls(n,np.einsum('ij,ij->i',n,A))
+
+  #Unit normals and offsets
+  def normalize(self):
+    nn = np.hypot(self.n[:,0],self.n[:,1])
+    return LineSet(self.n/nn[:,None],self.c/nn)
+
+  #Normal to parametric, as param_norm
+  #returns m,A: (N,2)
+  def to_param(self):
+    L = self.normalize()
+    A = np.zeros_like(L.n)
+    k = L.n[:,0] != 0
+    A[k,0] = L.c[k]/L.n[k,0]
+    A[~k,1] = L.c[~k]/L.n[~k,1]
+    m = L.n@omat.T
+    return m,A
+
+#Intersection of lines using Cramer's rule
+#n1,c1 and n2,c2 broadcast against each other
+def line_isect_cramer(n1,c1,n2,c2,tol=1e-12):
+  det = n1[...,0]*n2[...,1]-n1[...,1]*n2[...,0]
+  scale = np.hypot(n1[...,0],n1[...,1])*np.hypot(n2[...,0],n2[...,1])
+  par = np.abs(det) <= tol*scale
+  with np.errstate(divide='ignore',invalid='ignore'):
+    P = np.stack((c1*n2[...,1]-c2*n1[...,1],n1[...,0]*c2-n2[...,0]*c1),axis=-1)/det[...,None]
+  P[par] = np.nan
+  return P,par
+
+#Intersection of L1[i] with L2[i]
+def line_isect_pairs(L1,L2,tol=1e-12):
+  return line_isect_cramer(L1.n,L1.c,L2.n,L2.c,tol)
+
+#Intersection of every line in L1 with every line in L2
+#yields (i0, P, par) with P: (k,M,2) and par: (k,M) for rows i0:i0+k
+def line_isect_all(L1,L2,chunk=1024,tol=1e-12):
+  n2 = L2.n[None,:,:]
+  c2 = L2.c[None,:]
+  for i0 in range(0,len(L1),chunk):
+    n1 = L1.n[i0:i0+chunk,None,:]
+    c1 = L1.c[i0:i0+chunk,None]
+    P,par = line_isect_cramer(n1,c1,n2,c2,tol)
+    yield i0,P,par
+
 #Foot of the perpendicular
 def perp_foot(n,c,P):
   m = omat@n
@@ -114,6 +220,29 @@ def perp_foot(n,c,P):
   x_0=np.linalg.solve(N.T,p)
   return x_0
 
+#Feet of the perpendiculars and signed distances
+#n,c: one line ((2,1) or (2,) and scalar), K lines ((K,2) and (K,)) or a LineSet
+#P: (N,2) points, returns (N,2),(N,) for one line and (K,N,2),(K,N) for K
+def perp_foot_batch(n,c,P):
+  if isinstance(n,LineSet):
+    n,c = n.n,n.c
+    one = False
+  else:
+    n = np.asarray(n,dtype=float)
+    #decided by shape so that a (1,2) stack of K=1 lines keeps its K axis
+    one = n.ndim < 2 or n.shape == (2,1)
+  n = n.reshape(-1,2)
+  c = np.asarray(c,dtype=float).reshape(-1)
+  P = np.asarray(P,dtype=float).reshape(-1,2)
+  nn = np.hypot(n[:,0],n[:,1])
+  d = n@P.T
+  d -= c[:,None]
+  d /= nn[:,None]
+  x_0 = P[None,:,:]-(d/nn[:,None])[:,:,None]*n[:,None,:]
+  if one:
+    return x_0[0],d[0]
+  return x_0,d
+
 #Rotation matrix
 def rotmat(theta):
     #c = float(mp.cos(theta))
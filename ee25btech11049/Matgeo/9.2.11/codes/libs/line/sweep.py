@@ -0,0 +1,278 @@
+#released under GNU GPL
+#Segment intersection by Bentley-Ottmann sweep
+import heapq
+from bisect import bisect_left
+import numpy as np
+
+#Endpoints ordered left to right (lexicographically in x, then y)
+def _seg_order(A,B):
+  A = np.asarray(A,dtype=float).reshape(-1,2)
+  B = np.asarray(B,dtype=float).reshape(-1,2)
+  swap = (A[:,0] > B[:,0]) | ((A[:,0] == B[:,0]) & (A[:,1] > B[:,1]))
+  P = np.where(swap[:,None],B,A)
+  Q = np.where(swap[:,None],A,B)
+  return P,Q
+
+#Tolerance in data units
+def _seg_eps(P,Q,tol):
+  if P.shape[0] == 0:
+    return tol
+  ext = max(np.abs(P).max(),np.abs(Q).max(),1.0)
+  return tol*ext
+
+#Sweep status: segments ordered by key (y on the sweep line) in a list of
+#blocks of at most 2*load entries, so search, insertion and deletion cost
+#O(log n + load) instead of shifting one flat list of all n segments
+class _Status:
+  __slots__ = ('key','load','blocks','members')
+
+  def __init__(self,key,load=256):
+    self.key = key
+    self.load = load
+    self.blocks = []
+    self.members = set()
+
+  def __contains__(self,i):
+    return i in self.members
+
+  #Position (block, offset) of the first segment with key >= y
+  def find(self,y):
+    key = self.key
+    b = bisect_left(self.blocks,y,key=lambda blk: key(blk[-1]))
+    if b == len(self.blocks):
+      return b,0
+    return b,bisect_left(self.blocks[b],y,key=key)
+
+  #Segments just before and at a position, None past either end
+  def around(self,b,o):
+    blocks = self.blocks
+    if o > 0:
+      left = blocks[b][o-1]
+    else:
+      left = blocks[b-1][-1] if b > 0 else None
+    right = blocks[b][o] if b < len(blocks) else None
+    return left,right
+
+  #Remove the run of segments from a position with key <= y
+  #returns the run and the position it leaves behind
+  def take(self,b,o,y):
+    key = self.key
+    blocks = self.blocks
+    run = []
+    while b < len(blocks):
+      blk = blocks[b]
+      e = o
+      while e < len(blk) and key(blk[e]) <= y:
+        e += 1
+      stop = e < len(blk)
+      run.extend(blk[o:e])
+      del blk[o:e]
+      if stop:
+        break
+      if blk:
+        b += 1
+      else:
+        del blocks[b]
+      o = 0
+    self.members.difference_update(run)
+    return run,b,o
+
+  def insert(self,b,o,items):
+    if not items:
+      return
+    blocks = self.blocks
+    if not blocks:
+      blocks.append([])
+      b,o = 0,0
+    elif b == len(blocks):
+      b = len(blocks)-1
+      o = len(blocks[b])
+    blk = blocks[b]
+    blk[o:o] = items
+    if len(blk) > 2*self.load:
+      h = len(blk)//2
+      blocks[b+1:b+1] = [blk[h:]]
+      del blk[h:]
+    self.members.update(items)
+
+  #Remove segment i wherever it sits, searching near its key first
+  def remove(self,i,y):
+    blocks = self.blocks
+    b,o = self.find(y)
+    for bb in (b-1,b,b+1):
+      if 0 <= bb < len(blocks) and i in blocks[bb]:
+        break
+    else:
+      bb = next(k for k in range(len(blocks)) if i in blocks[k])
+    blocks[bb].remove(i)
+    if not blocks[bb]:
+      del blocks[bb]
+    self.members.discard(i)
+
+#All intersecting segment pairs by Bentley-Ottmann sweep
+#A,B: (N,2) endpoints
+#returns pairs (k,2) int and points (k,2); touching and
+#overlapping segments count, overlaps report the first common point
+#O((n+k) log n) for k intersecting pairs; with k near n^2 (long random
+#segments) the per-event Python cost makes seg_isect_brute faster
+def seg_isect_sweep(A,B,tol=1e-9):
+  P,Q = _seg_order(A,B)
+  eps = _seg_eps(P,Q,tol)
+  px,py = P[:,0].tolist(),P[:,1].tolist()
+  qx,qy = Q[:,0].tolist(),Q[:,1].tolist()
+  n = len(px)
+  dx = [qx[i]-px[i] for i in range(n)]
+  dy = [qy[i]-py[i] for i in range(n)]
+  slope = [dy[i]/dx[i] if dx[i] != 0 else np.inf for i in range(n)]
+  seglen = [max(np.hypot(dx[i],dy[i]),eps) for i in range(n)]
+
+  #events: point -> [upper endpoint of, lower endpoint of, passing through]
+  ev = {}
+  heap = []
+  def event(pt):
+    e = ev.get(pt)
+    if e is None:
+      e = ev[pt] = ([],[],set())
+      heapq.heappush(heap,pt)
+    return e
+  for i in range(n):
+    event((px[i],py[i]))[0].append(i)
+    event((qx[i],qy[i]))[1].append(i)
+
+  sweep = [0.0,0.0]
+  #y of segment i on the sweep line, verticals sit at the event
+  def yat(i):
+    x = sweep[0]
+    if dx[i] == 0:
+      return min(max(sweep[1],py[i]),qy[i])
+    if x == px[i]:
+      return py[i]
+    if x == qx[i]:
+      return qy[i]
+    return py[i]+dy[i]*((x-px[i])/dx[i])
+
+  #Intersection point of segments i and j, or None
+  def isect(i,j):
+    den = dx[i]*dy[j]-dy[i]*dx[j]
+    wx = px[j]-px[i]
+    wy = py[j]-py[i]
+    if abs(den) <= 1e-12*seglen[i]*seglen[j]:
+      if abs(dx[i]*wy-dy[i]*wx) > eps*seglen[i] or abs(dx[j]*wy-dy[j]*wx) > eps*seglen[j]:
+        return None
+      #collinear: overlap starts at the later left endpoint
+      s = max((px[i],py[i]),(px[j],py[j]))
+      t = min((qx[i],qy[i]),(qx[j],qy[j]))
+      return s if s <= t else None
+    t = (wx*dy[j]-wy*dx[j])/den
+    u = (wx*dy[i]-wy*dx[i])/den
+    ti = eps/seglen[i]
+    tj = eps/seglen[j]
+    if t < -ti or t > 1+ti or u < -tj or u > 1+tj:
+      return None
+    #snap to endpoints so touching events merge exactly
+    if abs(t) <= ti:
+      return (px[i],py[i])
+    if abs(t-1) <= ti:
+      return (qx[i],qy[i])
+    if abs(u) <= tj:
+      return (px[j],py[j])
+    if abs(u-1) <= tj:
+      return (qx[j],qy[j])
+    return (px[i]+t*dx[i],py[i]+t*dy[i])
+
+  def find_event(i,j,p):
+    r = isect(i,j)
+    if r is not None and r > p:
+      event(r)[2].update((i,j))
+
+  status = _Status(yat)
+  found = {}
+  while heap:
+    p = heapq.heappop(heap)
+    U,L,C = ev.pop(p)
+    sweep[0],sweep[1] = p
+    y = p[1]
+
+    #segments through p are contiguous in the status
+    sb,so = status.find(y-eps)
+    run,sb,so = status.take(sb,so,y+eps)
+    through = set(run)
+    #guard against ordering drift for known members
+    drift = False
+    for i in C.union(L):
+      if i not in through and i in status:
+        status.remove(i,yat(i))
+        through.add(i)
+        drift = True
+    if drift:
+      sb,so = status.find(y-eps)
+
+    near = through.union(U)
+    if len(near) > 1:
+      near = sorted(near)
+      for a in range(len(near)):
+        for b in range(a+1,len(near)):
+          key = (near[a],near[b])
+          if key not in found:
+            found[key] = p
+
+    ends = set(L)
+    new = [i for i in through.union(U) if i not in ends and (qx[i],qy[i]) != p]
+    #order just to the right of p
+    new.sort(key=lambda i:slope[i])
+    left,right = status.around(sb,so)
+    status.insert(sb,so,new)
+    if not new:
+      if left is not None and right is not None:
+        find_event(left,right,p)
+    else:
+      if left is not None:
+        find_event(left,new[0],p)
+      if right is not None:
+        find_event(new[-1],right,p)
+
+  if not found:
+    return np.zeros((0,2),dtype=np.int64),np.zeros((0,2))
+  pairs = np.array(list(found.keys()),dtype=np.int64)
+  pts = np.array(list(found.values()),dtype=float)
+  return pairs,pts
+
+#All intersecting segment pairs by testing every pair
+#same conventions as seg_isect_sweep, O(n^2)
+def seg_isect_brute(A,B,tol=1e-9):
+  P,Q = _seg_order(A,B)
+  eps = _seg_eps(P,Q,tol)
+  d = Q-P
+  seglen = np.maximum(np.hypot(d[:,0],d[:,1]),eps)
+  pairs = []
+  pts = []
+  n = P.shape[0]
+  for i in range(n-1):
+    j = np.arange(i+1,n)
+    w = P[j]-P[i]
+    den = d[i,0]*d[j,1]-d[i,1]*d[j,0]
+    par = np.abs(den) <= 1e-12*seglen[i]*seglen[j]
+    with np.errstate(divide='ignore',invalid='ignore'):
+      t = (w[:,0]*d[j,1]-w[:,1]*d[j,0])/den
+      u = (w[:,0]*d[i,1]-w[:,1]*d[i,0])/den
+    ti = eps/seglen[i]
+    tj = eps/seglen[j]
+    t[par] = 0
+    u[par] = 0
+    hit = ~par & (t >= -ti) & (t <= 1+ti) & (u >= -tj) & (u <= 1+tj)
+    X = P[i]+t[:,None]*d[i]
+    #collinear overlaps
+    col = par & (np.abs(d[i,0]*w[:,1]-d[i,1]*w[:,0]) <= eps*seglen[i])
+    col &= np.abs(d[j,0]*w[:,1]-d[j,1]*w[:,0]) <= eps*seglen[j]
+    for k in np.flatnonzero(col):
+      s = max(tuple(P[i]),tuple(P[j[k]]))
+      e = min(tuple(Q[i]),tuple(Q[j[k]]))
+      if s <= e:
+        hit[k] = True
+        X[k] = s
+    for k in np.flatnonzero(hit):
+      pairs.append((i,j[k]))
+      pts.append(X[k])
+  if not pairs:
+    return np.zeros((0,2),dtype=np.int64),np.zeros((0,2))
+  return np.array(pairs,dtype=np.int64),np.array(pts)
@@ -0,0 +1,193 @@
+#released under GNU GPL
+#Delaunay triangulation by Bowyer-Watson insertion
+from fractions import Fraction
+import numpy as np
+
+#Shewchuk's static error bounds for the orientation and in-circle determinants
+_ccw_err = 3.3306690738754716e-16
+_icc_err = 1.1102230246251577e-15
+
+#Twice the signed area of abc, positive for counterclockwise
+#exact rational fallback when the float result is not certain
+def orient(ax,ay,bx,by,cx,cy):
+  l = (ax-cx)*(by-cy)
+  r = (ay-cy)*(bx-cx)
+  det = l-r
+  if abs(det) > _ccw_err*(abs(l)+abs(r)):
+    return det
+  F = Fraction
+  return float((F(ax)-F(cx))*(F(by)-F(cy))-(F(ay)-F(cy))*(F(bx)-F(cx)))
+
+#Positive if d lies inside the circumcircle of counterclockwise abc
+def incircle(ax,ay,bx,by,cx,cy,dx,dy):
+  adx,ady = ax-dx,ay-dy
+  bdx,bdy = bx-dx,by-dy
+  cdx,cdy = cx-dx,cy-dy
+  al = adx*adx+ady*ady
+  bl = bdx*bdx+bdy*bdy
+  cl = cdx*cdx+cdy*cdy
+  bc,cb = bdx*cdy,cdx*bdy
+  ca,ac = cdx*ady,adx*cdy
+  ab,ba = adx*bdy,bdx*ady
+  det = al*(bc-cb)+bl*(ca-ac)+cl*(ab-ba)
+  perm = (abs(bc)+abs(cb))*al+(abs(ca)+abs(ac))*bl+(abs(ab)+abs(ba))*cl
+  if abs(det) > _icc_err*perm:
+    return det
+  F = Fraction
+  adx,ady = F(ax)-F(dx),F(ay)-F(dy)
+  bdx,bdy = F(bx)-F(dx),F(by)-F(dy)
+  cdx,cdy = F(cx)-F(dx),F(cy)-F(dy)
+  al = adx*adx+ady*ady
+  bl = bdx*bdx+bdy*bdy
+  cl = cdx*cdx+cdy*cdy
+  return float(al*(bdx*cdy-cdx*bdy)+bl*(cdx*ady-adx*cdy)+cl*(adx*bdy-bdx*ady))
+
+#Insertion order: random rounds of doubling size (BRIO), each round
+#swept through a grid of rows in serpentine order so consecutive
+#points are close and the point location walk stays short
+def _insert_order(P,seed=0):
+  n = P.shape[0]
+  idx = np.random.default_rng(seed).permutation(n)
+  lo = P.min(axis=0)
+  ext = np.maximum(P.max(axis=0)-lo,1e-300)
+  out = []
+  s = 0
+  e = min(n,64)
+  while s < n:
+    r = idx[s:e]
+    rows = max(1,int(np.sqrt((e-s)/2)))
+    row = np.minimum(((P[r,1]-lo[1])/ext[1]*rows).astype(np.int64),rows-1)
+    x = np.where(row%2 == 0,P[r,0],-P[r,0])
+    out.append(r[np.lexsort((x,row))])
+    s = e
+    e = min(n,2*e)
+  return np.concatenate(out) if out else idx
+
+#Delaunay triangulation of (N,2) points
+#duplicate points are merged, collinear input gives no triangles
+#returns tri: (T,3) int32 counterclockwise vertex indices into P and
+#nbr: (T,3) int32 with nbr[t,k] the triangle opposite tri[t,k], -1 on the hull
+def delaunay(P,seed=0):
+  P = np.asarray(P,dtype=float).reshape(-1,2)
+  U,first = np.unique(P,axis=0,return_index=True)
+  n = U.shape[0]
+  empty = np.zeros((0,3),dtype=np.int32)
+  if n < 3:
+    return empty,empty.copy()
+  order = _insert_order(U,seed).tolist()
+  X = U[:,0].tolist()
+  Y = U[:,1].tolist()
+  #ghost vertex closing the hull, ghost triangles are (a,b,G) with
+  #the outside of hull edge ab on its left
+  G = n
+
+  #first non-degenerate triangle
+  a,b = order[0],order[1]
+  k = 2
+  while k < n and orient(X[a],Y[a],X[b],Y[b],X[order[k]],Y[order[k]]) == 0:
+    k += 1
+  if k == n:
+    return empty,empty.copy()
+  c = order.pop(k)
+  if orient(X[a],Y[a],X[b],Y[b],X[c],Y[c]) < 0:
+    b,c = c,b
+  #flat triangle storage, neighbour k is across the edge opposite vertex k
+  tv = [a,b,c,b,a,G,c,b,G,a,c,G]
+  tn = [2,3,1,3,2,0,1,3,0,2,1,0]
+  free = []
+
+  #ghost triangle conflicts: p strictly outside edge ab or inside the segment
+  def conflict(t,px,py):
+    a,b,c = tv[3*t],tv[3*t+1],tv[3*t+2]
+    if c == G:
+      o = orient(X[a],Y[a],X[b],Y[b],px,py)
+      if o != 0:
+        return o > 0
+      return (px-X[a])*(px-X[b])+(py-Y[a])*(py-Y[b]) < 0
+    return incircle(X[a],Y[a],X[b],Y[b],X[c],Y[c],px,py) > 0
+
+  #walk towards p, ends in a triangle holding p or a ghost seeing it
+  def locate(t,px,py):
+    if tv[3*t+2] == G:
+      t = tn[3*t+2]
+    while True:
+      i = 3*t
+      if tv[i+2] == G:
+        return t
+      a,b,c = tv[i],tv[i+1],tv[i+2]
+      ax,ay,bx,by,cx,cy = X[a],Y[a],X[b],Y[b],X[c],Y[c]
+      if orient(bx,by,cx,cy,px,py) < 0:
+        t = tn[i]
+      elif orient(cx,cy,ax,ay,px,py) < 0:
+        t = tn[i+1]
+      elif orient(ax,ay,bx,by,px,py) < 0:
+        t = tn[i+2]
+      else:
+        return t
+
+  last = 0
+  for p in order[2:]:
+    px,py = X[p],Y[p]
+    t = locate(last,px,py)
+    #cavity of triangles whose circumcircle holds p
+    dead = [t]
+    seen = {t:True}
+    bnd = []
+    j = 0
+    while j < len(dead):
+      s = dead[j]
+      j += 1
+      for k in range(3):
+        nb = tn[3*s+k]
+        ok = seen.get(nb)
+        if ok is None:
+          ok = seen[nb] = conflict(nb,px,py)
+          if ok:
+            dead.append(nb)
+        if not ok:
+          bnd.append((tv[3*s+(k+1)%3],tv[3*s+(k+2)%3],nb))
+    #fan of new triangles (u,v,p) over the cavity boundary
+    free.extend(dead)
+    ids = []
+    start = {}
+    end = {}
+    for u,v,nb in bnd:
+      if free:
+        t = free.pop()
+      else:
+        t = len(tv)//3
+        tv.extend((0,0,0))
+        tn.extend((0,0,0))
+      ids.append(t)
+      start[u] = t
+      end[v] = t
+    for t,(u,v,nb) in zip(ids,bnd):
+      i = 3*t
+      if u == G:
+        tv[i:i+3] = v,p,u
+        tn[i:i+3] = end[u],nb,start[v]
+      elif v == G:
+        tv[i:i+3] = p,u,v
+        tn[i:i+3] = nb,start[v],end[u]
+      else:
+        tv[i:i+3] = u,v,p
+        tn[i:i+3] = start[v],end[u],nb
+        last = t
+      i = 3*nb
+      for k in range(3):
+        w = tv[i+k]
+        if w != u and w != v:
+          tn[i+k] = t
+          break
+
+  #compact the real triangles
+  tv = np.array(tv,dtype=np.int64).reshape(-1,3)
+  tn = np.array(tn,dtype=np.int64).reshape(-1,3)
+  live = np.ones(tv.shape[0],dtype=bool)
+  live[free] = False
+  live &= tv[:,2] != G
+  new = np.full(tv.shape[0]+1,-1,dtype=np.int64)
+  new[np.flatnonzero(live)] = np.arange(np.count_nonzero(live))
+  tri = first[tv[live]].astype(np.int32)
+  nbr = new[tn[live]].astype(np.int32)
+  return tri,nbr
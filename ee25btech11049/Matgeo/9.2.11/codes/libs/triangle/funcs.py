@@ -10,6 +10,7 @@ import numpy.linalg as LA
 from line.funcs import*
 #from line.params import *
 from .params import *
+from .delaunay import delaunay
 
 #Triangle sides
 def tri_sides(A,B,C):
@@ -45,6 +46,41 @@ def tri_const_sum(K,angB,angC):
   A=np.array(([x[2][0]*np.cos(angB),x[2][0]*np.sin(angB)])).reshape(-1,1)
   return  A,B,C
 
+#Batched constructions, parameters broadcast against each other
+#and the triangles come back as (N,3,2) stacks of A,B,C with
+#B at the origin and C on the positive x axis
+
+def _tri_stack(Ax,Ay,a):
+  T = np.zeros(Ax.shape+(3,2))
+  T[:,0,0] = Ax
+  T[:,0,1] = Ay
+  T[:,2,0] = a
+  return T
+
+#a,b,c
+def tri_vert_batch(a,b,c):
+  a,b,c = np.broadcast_arrays(*(np.asarray(x,dtype=float).reshape(-1) for x in (a,b,c)))
+  p = (a**2+c**2-b**2)/(2*a)
+  q = np.sqrt(c**2-p**2)
+  return _tri_stack(p,q,a)
+
+#a,b+c,angB
+def tri_const_batch(a,K,angB):
+  a,K,angB = np.broadcast_arrays(*(np.asarray(x,dtype=float).reshape(-1) for x in (a,K,angB)))
+  c = 0.5*(K**2-a**2)/(K-a*np.cos(angB))
+  return _tri_stack(c*np.cos(angB),c*np.sin(angB),a)
+
+#a+b+c,angB,angC, sides in proportion to the sines of the opposite angles
+def tri_const_sum_batch(K,angB,angC):
+  K,angB,angC = np.broadcast_arrays(*(np.asarray(x,dtype=float).reshape(-1) for x in (K,angB,angC)))
+  sA = np.sin(angB+angC)
+  sB = np.sin(angB)
+  sC = np.sin(angC)
+  k = K/(sA+sB+sC)
+  a = k*sA
+  c = k*sC
+  return _tri_stack(c*np.cos(angB),c*np.sin(angB),a)
+
 #Triangle  mid points
 def tri_mid_pt(A,B,C):
   D = (B+C)/2
@@ -86,6 +122,158 @@ def icircle(A,B,C):
   return I,r
 
 
+#Batched versions over (N,3,2) arrays of vertices A,B,C
+
+#Triangle sides, columns c,a,b as in tri_sides
+def tri_sides_batch(T):
+  T = np.asarray(T,dtype=float).reshape(-1,3,2)
+  d = T-T[:,[1,2,0]]
+  return np.hypot(d[...,0],d[...,1])
+
+#Triangle mid points, (N,3,2) with rows D,E,F
+def tri_mid_pt_batch(T):
+  T = np.asarray(T,dtype=float).reshape(-1,3,2)
+  return 0.5*(T[:,[1,2,0]]+T[:,[2,0,1]])
+
+#Triangle areas, positive for counterclockwise ABC if signed
+def tri_area_batch(T,signed=False):
+  T = np.asarray(T,dtype=float).reshape(-1,3,2)
+  b = T[:,1]-T[:,0]
+  c = T[:,2]-T[:,0]
+  ar = 0.5*(b[:,0]*c[:,1]-b[:,1]*c[:,0])
+  return ar if signed else np.abs(ar)
+
+#Circumcentres (N,2) and circumradii (N,)
+#degenerate triangles give inf or nan
+def ccircle_batch(T):
+  T = np.asarray(T,dtype=float).reshape(-1,3,2)
+  b = T[:,1]-T[:,0]
+  c = T[:,2]-T[:,0]
+  b2 = np.einsum('ij,ij->i',b,b)
+  c2 = np.einsum('ij,ij->i',c,c)
+  d = 2*(b[:,0]*c[:,1]-b[:,1]*c[:,0])
+  with np.errstate(divide='ignore',invalid='ignore'):
+    u = np.stack((c[:,1]*b2-b[:,1]*c2,b[:,0]*c2-c[:,0]*b2),axis=-1)/d[:,None]
+  return T[:,0]+u,np.hypot(u[:,0],u[:,1])
+
+#Incentres (N,2) and inradii (N,)
+def icircle_batch(T):
+  T = np.asarray(T,dtype=float).reshape(-1,3,2)
+  s = tri_sides_batch(T)[:,[1,2,0]]
+  p = s.sum(axis=1)
+  with np.errstate(divide='ignore',invalid='ignore'):
+    I = np.einsum('ij,ijk->ik',s,T)/p[:,None]
+    r = 2*tri_area_batch(T)/p
+  return I,r
+
+
+#Triangle mesh with shared vertices
+#verts: (V,2) float, faces: (T,3) int32 vertex indices
+#derived quantities are computed in bulk and cached until the vertices
+#or faces are reassigned; the stored arrays are read-only copies
+class TriMesh:
+  __slots__ = ('_verts','_faces','_cache')
+
+  def __init__(self,verts,faces):
+    self._cache = {}
+    self.verts = verts
+    self.faces = faces
+
+  #Mesh from (N,3,2) triangle vertices, merging repeated vertices
+  @classmethod
+  def from_triangles(cls,T):
+    T = np.asarray(T,dtype=float).reshape(-1,2)
+    verts,inv = np.unique(T,axis=0,return_inverse=True)
+    return cls(verts,inv.reshape(-1,3))
+
+  #Delaunay triangulation of (N,2) points
+  @classmethod
+  def from_delaunay(cls,P):
+    P = np.asarray(P,dtype=float).reshape(-1,2)
+    tri,nbr = delaunay(P)
+    return cls(P,tri)
+
+  @property
+  def verts(self):
+    return self._verts
+
+  @verts.setter
+  def verts(self,verts):
+    verts = np.array(verts,dtype=float).reshape(-1,2)
+    verts.flags.writeable = False
+    self._verts = verts
+    self._cache.clear()
+
+  @property
+  def faces(self):
+    return self._faces
+
+  @faces.setter
+  def faces(self,faces):
+    faces = np.array(faces,dtype=np.int32).reshape(-1,3)
+    faces.flags.writeable = False
+    self._faces = faces
+    self._cache.clear()
+
+  def __len__(self):
+    return self.faces.shape[0]
+
+  def _get(self,key,func):
+    val = self._cache.get(key)
+    if val is None:
+      val = self._cache[key] = func()
+    return val
+
+  #(T,3,2) vertices A,B,C of each face
+  @property
+  def tris(self):
+    return self._get('tris',lambda: self._verts[self.faces])
+
+  #(T,3) side lengths c,a,b as tri_sides
+  @property
+  def sides(self):
+    return self._get('sides',lambda: tri_sides_batch(self.tris))
+
+  #(T,3,2) mid points D,E,F as tri_mid_pt
+  @property
+  def mid_pts(self):
+    return self._get('mid_pts',lambda: tri_mid_pt_batch(self.tris))
+
+  @property
+  def areas(self):
+    return self._get('areas',lambda: tri_area_batch(self.tris))
+
+  @property
+  def centroids(self):
+    return self._get('centroids',lambda: self.tris.mean(axis=1))
+
+  #circumcentres (T,2) and circumradii (T,) as ccircle
+  @property
+  def ccircles(self):
+    return self._get('ccircles',lambda: ccircle_batch(self.tris))
+
+  #incentres (T,2) and inradii (T,) as icircle
+  @property
+  def icircles(self):
+    return self._get('icircles',lambda: icircle_batch(self.tris))
+
+  #(E,2) int32 unique undirected edges, lower index first
+  @property
+  def edges(self):
+    def edges():
+      e = self.faces[:,[0,1,1,2,2,0]].reshape(-1,2)
+      return np.unique(np.sort(e,axis=1),axis=0)
+    return self._get('edges',edges)
+
+  #(E,) lengths of the unique edges
+  @property
+  def edge_len(self):
+    def edge_len():
+      d = self._verts[self.edges[:,1]]-self._verts[self.edges[:,0]]
+      return np.hypot(d[:,0],d[:,1])
+    return self._get('edge_len',edge_len)
+
+
 
 #Incircle points of contact
 '''
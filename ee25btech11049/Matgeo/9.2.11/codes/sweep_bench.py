@@ -0,0 +1,48 @@
+# Benchmark of the sweep-line segment intersection against brute force
+# Segments are short random chords, as produced by line_gen endpoints.
+
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, '.')
+from libs.line.sweep import seg_isect_sweep, seg_isect_brute
+
+rng = np.random.default_rng(0)
+
+def segments(n):
+    # Segment length shrinks with n so the number of crossings stays O(n)
+    A = rng.random((n, 2))
+    B = A + rng.normal(scale=1/np.sqrt(n), size=(n, 2))
+    return A, B
+
+def timed(func, A, B):
+    t0 = time.perf_counter()
+    pairs, _ = func(A, B)
+    return time.perf_counter() - t0, pairs.shape[0]
+
+print(f"{'n':>8} {'k':>8} {'sweep (s)':>10} {'brute (s)':>10}")
+for n in [1000, 2000, 4000, 8000, 16000, 100000]:
+    A, B = segments(n)
+    t_sweep, k = timed(seg_isect_sweep, A, B)
+    # Brute force is quadratic, skip it where it would take minutes
+    if n <= 16000:
+        t_brute, k_brute = timed(seg_isect_brute, A, B)
+        assert k == k_brute
+        brute = f"{t_brute:10.3f}"
+    else:
+        brute = f"{'-':>10}"
+    print(f"{n:8d} {k:8d} {t_sweep:10.3f} {brute}")
+
+# Dense case: long random chords cross about n^2/8 times. The sweep is
+# output-sensitive, O((n+k) log n), so with k ~ n^2 its per-event Python
+# cost loses to the vectorised brute force.
+print()
+print(f"{'n':>8} {'k':>8} {'sweep (s)':>10} {'brute (s)':>10}  (dense)")
+for n in [250, 500, 1000, 2000]:
+    A = rng.random((n, 2))
+    B = rng.random((n, 2))
+    t_sweep, k = timed(seg_isect_sweep, A, B)
+    t_brute, k_brute = timed(seg_isect_brute, A, B)
+    assert k == k_brute
+    print(f"{n:8d} {k:8d} {t_sweep:10.3f} {t_brute:10.3f}")